@@ -1,25 +1,37 @@
 """Async backfill trigger endpoint for Grafana integration."""
 
 import asyncio
-from datetime import datetime, timezone
-from fastapi import APIRouter, Query, BackgroundTasks, HTTPException
-from typing import Dict
+import time
+from datetime import datetime
+import orjson
+from fastapi import APIRouter, Query, BackgroundTasks, HTTPException, Response
+from typing import Dict, List
 from loguru import logger
 
-from app.brokers import get_broker
-from app.services.candle_service import CandleService
+from app.services.candle_service import get_candle_service
 from app.services.auto_backfill import update_backfill_status
+from app.database.models import Interval
+from app.utils.dates import DateOrDateTime, as_utc
 
 router = APIRouter()
 
+# Constant status payload, serialized once
+_STATUS_BODY = orjson.dumps(
+    {
+        "status": "ready",
+        "service": "async-backfill",
+        "description": "Trigger with /api/backfill/trigger?instrument_token=X&from_date=Y&to_date=Z&interval=1m",
+    }
+)
+
 
 @router.post("/trigger")
 async def trigger_backfill(
     background_tasks: BackgroundTasks,
     instrument_token: int = Query(...),
-    from_date: str = Query(...),
-    to_date: str = Query(...),
-    interval: str = Query("1m", regex="^(1m|5m|15m|1h|1d)$"),
+    from_date: DateOrDateTime = Query(...),
+    to_date: DateOrDateTime = Query(...),
+    interval: Interval = Query(Interval.M1),
 ) -> Dict:
     """
     Trigger async backfill for missing data.
@@ -28,29 +40,16 @@ async def trigger_backfill(
     Perfect for Grafana: call this, then query TimescaleDB directly.
     """
     try:
-        # Parse dates
-        try:
-            from_dt = datetime.strptime(from_date, "%Y-%m-%d %H:%M:%S").replace(
-                tzinfo=timezone.utc
-            )
-        except ValueError:
-            from_dt = datetime.strptime(from_date, "%Y-%m-%d").replace(
-                tzinfo=timezone.utc
-            )
-
-        try:
-            to_dt = datetime.strptime(to_date, "%Y-%m-%d %H:%M:%S").replace(
-                tzinfo=timezone.utc
-            )
-        except ValueError:
-            to_dt = datetime.strptime(to_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        # Dates are parsed by FastAPI; treat naive values as UTC
+        from_dt = as_utc(from_date)
+        to_dt = as_utc(to_date)
 
         # Validate
         if from_dt > to_dt:
             raise HTTPException(
                 status_code=400, detail="from_date must be before to_date"
             )
-        if from_dt > datetime.now(timezone.utc):
+        if from_dt.timestamp() > time.time():
             raise HTTPException(
                 status_code=400, detail="from_date cannot be in the future"
             )
@@ -61,12 +60,12 @@ async def trigger_backfill(
             instrument_token=instrument_token,
             from_date=from_dt,
             to_date=to_dt,
-            interval=interval,
+            interval=interval.value,
         )
 
         logger.info(
             f"🔄 Backfill triggered for token={instrument_token}, "
-            f"range={from_dt.date()} to {to_dt.date()}, interval={interval}"
+            f"range={from_dt.date()} to {to_dt.date()}, interval={interval.value}"
         )
 
         return {
@@ -75,7 +74,7 @@ async def trigger_backfill(
             "instrument_token": instrument_token,
             "from_date": from_dt.isoformat(),
             "to_date": to_dt.isoformat(),
-            "interval": interval,
+            "interval": interval.value,
             "status": "processing",
         }
 
@@ -92,9 +91,9 @@ async def trigger_backfill(
 async def trigger_backfill_get(
     background_tasks: BackgroundTasks,
     instrument_token: int = Query(...),
-    from_date: str = Query(...),
-    to_date: str = Query(...),
-    interval: str = Query("1m", regex="^(1m|5m|15m|1h|1d)$"),
+    from_date: DateOrDateTime = Query(...),
+    to_date: DateOrDateTime = Query(...),
+    interval: Interval = Query(Interval.M1),
 ) -> Dict:
     """
     GET version of trigger endpoint (for Grafana Infinity plugin).
@@ -125,8 +124,7 @@ async def _async_backfill(
             f"interval={interval}, range={from_date.date()} to {to_date.date()}"
         )
 
-        broker = get_broker()
-        service = CandleService(broker)
+        service = get_candle_service()
 
         # This will detect gaps and fill them
         candles = await service.get_candles(
@@ -145,19 +143,91 @@ async def _async_backfill(
         )
 
     except Exception as e:
-        logger.error(f"❌ Background backfill failed: {e}")
-        import traceback
+        logger.opt(exception=True).error(f"❌ Background backfill failed: {e}")
+
+
+@router.post("/trigger/batch")
+async def trigger_backfill_batch(
+    background_tasks: BackgroundTasks,
+    instrument_tokens: List[int] = Query(...),
+    from_date: DateOrDateTime = Query(...),
+    to_date: DateOrDateTime = Query(...),
+    interval: Interval = Query(Interval.M1),
+) -> Dict:
+    """
+    Trigger one background backfill for several instruments.
+
+    Instruments are fetched concurrently and the candle aggregates are
+    refreshed once for all of them.
+    """
+    from_dt = as_utc(from_date)
+    to_dt = as_utc(to_date)
+    if from_dt > to_dt:
+        raise HTTPException(
+            status_code=400, detail="from_date must be before to_date"
+        )
+    if from_dt.timestamp() > time.time():
+        raise HTTPException(
+            status_code=400, detail="from_date cannot be in the future"
+        )
+
+    background_tasks.add_task(
+        _async_backfill_batch,
+        instrument_tokens=instrument_tokens,
+        from_date=from_dt,
+        to_date=to_dt,
+        interval=interval.value,
+    )
 
-        logger.error(traceback.format_exc())
+    logger.info(
+        f"🔄 Batch backfill triggered for {len(instrument_tokens)} instruments, "
+        f"range={from_dt.date()} to {to_dt.date()}, interval={interval.value}"
+    )
+
+    return {
+        "success": True,
+        "message": "Backfill triggered",
+        "instrument_tokens": instrument_tokens,
+        "from_date": from_dt.isoformat(),
+        "to_date": to_dt.isoformat(),
+        "interval": interval.value,
+        "status": "processing",
+    }
+
+
+async def _async_backfill_batch(
+    instrument_tokens: List[int],
+    from_date: datetime,
+    to_date: datetime,
+    interval: str,
+):
+    """Background task backfilling several instruments at once."""
+    try:
+        service = get_candle_service()
+        results = await service.backfill_many(
+            instrument_tokens, from_date, to_date, interval
+        )
+
+        for token, result in zip(instrument_tokens, results):
+            if isinstance(result, Exception):
+                logger.opt(exception=result).error(
+                    f"❌ Background backfill failed for token={token}: {result}"
+                )
+                continue
+            await update_backfill_status(token, from_date, to_date, result)
+
+        logger.info(
+            f"✅ Background batch backfill complete for {len(instrument_tokens)} "
+            f"instruments, interval={interval}"
+        )
+
+    except Exception as e:
+        logger.opt(exception=True).error(f"❌ Background batch backfill failed: {e}")
 
 
 @router.get("/status")
-async def backfill_status() -> Dict:
+async def backfill_status() -> Response:
     """
     Check backfill service status.
     """
-    return {
-        "status": "ready",
-        "service": "async-backfill",
-        "description": "Trigger with /api/backfill/trigger?instrument_token=X&from_date=Y&to_date=Z&interval=1m",
-    }
+    return Response(content=_STATUS_BODY, media_type="application/json")
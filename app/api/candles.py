@@ -1,14 +1,17 @@
 """Smart candles API endpoint with automatic gap filling."""
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from pydantic import BaseModel, field_validator
+import time
 from datetime import datetime
 from typing import List, Dict
 from loguru import logger
 
-from app.services.candle_service import CandleService
-from app.brokers import get_broker
+from app.database.models import Interval
+from app.services.candle_service import get_candle_service
 from app.services.auto_backfill import track_instrument
+from app.utils.dates import DateOrDateTime, as_utc
+from app.utils.responses import ORJSONResponse
 
 router = APIRouter()
 
@@ -17,23 +20,28 @@ class CandleRequest(BaseModel):
     """Request model for candle data."""
 
     instrument_token: int
-    from_date: datetime
-    to_date: datetime
-    interval: str = "1m"  # 1m, 5m, 15m, 1h, 1d
+    from_date: DateOrDateTime
+    to_date: DateOrDateTime
+    interval: Interval = Interval.M1
+
+    @field_validator("from_date", "to_date")
+    @classmethod
+    def _ensure_utc(cls, value: datetime) -> datetime:
+        """Treat naive datetimes as UTC."""
+        return as_utc(value)
 
 
 @router.get("/")
 async def get_candles(
+    background_tasks: BackgroundTasks,
     instrument_token: int = Query(..., description="Instrument token"),
-    from_date: str = Query(
+    from_date: DateOrDateTime = Query(
         ..., description="Start date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)"
     ),
-    to_date: str = Query(
+    to_date: DateOrDateTime = Query(
         ..., description="End date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)"
     ),
-    interval: str = Query(
-        "1m", regex="^(1m|5m|15m|1h|1d)$", description="Candle interval"
-    ),
+    interval: Interval = Query(Interval.M1, description="Candle interval"),
 ):
     """
     Get candle data with automatic gap filling.
@@ -56,24 +64,9 @@ async def get_candles(
         List of candles with OHLCV data
     """
     try:
-        # Parse dates (support both formats) and make them timezone-aware
-        from datetime import timezone
-
-        try:
-            from_dt = datetime.strptime(from_date, "%Y-%m-%d %H:%M:%S").replace(
-                tzinfo=timezone.utc
-            )
-        except ValueError:
-            from_dt = datetime.strptime(from_date, "%Y-%m-%d").replace(
-                tzinfo=timezone.utc
-            )
-
-        try:
-            to_dt = datetime.strptime(to_date, "%Y-%m-%d %H:%M:%S").replace(
-                tzinfo=timezone.utc
-            )
-        except ValueError:
-            to_dt = datetime.strptime(to_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        # Dates are parsed by FastAPI; treat naive values as UTC
+        from_dt = as_utc(from_date)
+        to_dt = as_utc(to_date)
 
         # Validate dates
         if from_dt > to_dt:
@@ -81,41 +74,38 @@ async def get_candles(
                 status_code=400, detail="from_date must be before to_date"
             )
 
-        if from_dt > datetime.now(timezone.utc):
+        if from_dt.timestamp() > time.time():
             raise HTTPException(
                 status_code=400, detail="from_date cannot be in the future"
             )
 
-        # Track instrument for auto-backfill
-        track_instrument(instrument_token)
-
-        # Get broker instance
-        broker = get_broker()
+        # Track instrument for auto-backfill (runs after the response is sent)
+        background_tasks.add_task(track_instrument, instrument_token)
 
-        # Create candle service
-        service = CandleService(broker)
+        service = get_candle_service()
 
         # Get candles with automatic gap filling
-        candles = await service.get_candles(instrument_token, from_dt, to_dt, interval)
-
-        return {
-            "success": True,
-            "instrument_token": instrument_token,
-            "interval": interval,
-            "from_date": from_dt.isoformat(),
-            "to_date": to_dt.isoformat(),
-            "count": len(candles),
-            "candles": candles,
-        }
+        candles = await service.get_candles(
+            instrument_token, from_dt, to_dt, interval.value
+        )
+
+        return ORJSONResponse(
+            {
+                "success": True,
+                "instrument_token": instrument_token,
+                "interval": interval.value,
+                "from_date": from_dt.isoformat(),
+                "to_date": to_dt.isoformat(),
+                "count": len(candles),
+                "candles": candles,
+            }
+        )
 
     except ValueError as e:
         logger.error(f"Invalid date format: {e}")
         raise HTTPException(status_code=400, detail=f"Invalid date format: {e}")
     except Exception as e:
-        import traceback
-
-        logger.error(f"Error fetching candles: {e}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.opt(exception=True).error(f"Error fetching candles: {e}")
         raise HTTPException(
             status_code=500, detail=f"Failed to fetch candles: {str(e)}"
         )
@@ -130,29 +120,27 @@ async def post_candles(request: CandleRequest):
     Useful for complex queries or when URL length is a concern.
     """
     try:
-        # Get broker instance
-        broker = get_broker()
-
-        # Create candle service
-        service = CandleService(broker)
+        service = get_candle_service()
 
         # Get candles with automatic gap filling
         candles = await service.get_candles(
             request.instrument_token,
             request.from_date,
             request.to_date,
-            request.interval,
+            request.interval.value,
         )
 
-        return {
-            "success": True,
-            "instrument_token": request.instrument_token,
-            "interval": request.interval,
-            "from_date": request.from_date.isoformat(),
-            "to_date": request.to_date.isoformat(),
-            "count": len(candles),
-            "candles": candles,
-        }
+        return ORJSONResponse(
+            {
+                "success": True,
+                "instrument_token": request.instrument_token,
+                "interval": request.interval.value,
+                "from_date": request.from_date.isoformat(),
+                "to_date": request.to_date.isoformat(),
+                "count": len(candles),
+                "candles": candles,
+            }
+        )
 
     except Exception as e:
         logger.error(f"Error fetching candles: {e}")
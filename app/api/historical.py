@@ -4,11 +4,12 @@ NOTE: The /candles endpoint has been moved to app/api/candles.py with smart gap
 This file now only contains the raw tick data endpoint.
 """
 
-from datetime import datetime
 from fastapi import APIRouter, HTTPException, Query
 from loguru import logger
 
 from app.services.historical import HistoricalDataService
+from app.utils.dates import DateOrDateTime, as_utc
+from app.utils.responses import ORJSONResponse
 
 
 router = APIRouter()
@@ -17,8 +18,8 @@ router = APIRouter()
 @router.get("/ticks")
 async def get_tick_data(
     instrument_token: int = Query(...),
-    from_date: str = Query(...),
-    to_date: str = Query(...),
+    from_date: DateOrDateTime = Query(...),
+    to_date: DateOrDateTime = Query(...),
 ):
     """
     Get raw tick data.
@@ -29,28 +30,23 @@ async def get_tick_data(
         to_date: End date (YYYY-MM-DD HH:MM:SS)
     """
     try:
-        # Parse dates
-        try:
-            from_dt = datetime.strptime(from_date, "%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            from_dt = datetime.strptime(from_date, "%Y-%m-%d")
-
-        try:
-            to_dt = datetime.strptime(to_date, "%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            to_dt = datetime.strptime(to_date, "%Y-%m-%d")
+        # Dates are parsed by FastAPI; treat naive values as UTC
+        from_dt = as_utc(from_date)
+        to_dt = as_utc(to_date)
 
         # Get ticks
         ticks = await HistoricalDataService.get_tick_data(
             instrument_token, from_dt, to_dt
         )
 
-        return {
-            "success": True,
-            "instrument_token": instrument_token,
-            "count": len(ticks),
-            "ticks": ticks,
-        }
+        return ORJSONResponse(
+            {
+                "success": True,
+                "instrument_token": instrument_token,
+                "count": len(ticks),
+                "ticks": ticks,
+            }
+        )
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {e}")
@@ -5,8 +5,8 @@ from pydantic import BaseModel
 from loguru import logger
 
 from app.services.instruments import InstrumentService
-from app.database.connection import get_db_pool
-from app.database.models import SubscriptionQueries
+from app.services.subscriptions import SubscriptionService
+from app.utils.responses import ORJSONResponse
 
 
 router = APIRouter()
@@ -49,7 +49,8 @@ async def get_instruments(
     """
     try:
         instruments = await InstrumentService.get_all_instruments(limit, offset)
-        return instruments
+        # Rows are serialized as-is; the query selects InstrumentResponse's fields
+        return ORJSONResponse(instruments)
     except Exception as e:
         logger.error(f"Failed to get instruments: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch instruments")
@@ -69,7 +70,7 @@ async def search_instruments(
     """
     try:
         instruments = await InstrumentService.search_instruments(q, limit)
-        return instruments
+        return ORJSONResponse(instruments)
     except Exception as e:
         logger.error(f"Failed to search instruments: {e}")
         raise HTTPException(status_code=500, detail="Failed to search instruments")
@@ -124,10 +125,7 @@ async def subscribe_instruments(request: SubscribeRequest):
         request: List of instrument tokens to subscribe
     """
     try:
-        pool = await get_db_pool()
-        
-        for token in request.tokens:
-            await SubscriptionQueries.subscribe_instrument(pool, token)
+        await SubscriptionService.subscribe(request.tokens)
         
         logger.info(f"Subscribed to {len(request.tokens)} instruments")
         
@@ -150,10 +148,7 @@ async def unsubscribe_instruments(request: SubscribeRequest):
         request: List of instrument tokens to unsubscribe
     """
     try:
-        pool = await get_db_pool()
-        
-        for token in request.tokens:
-            await SubscriptionQueries.unsubscribe_instrument(pool, token)
+        await SubscriptionService.unsubscribe(request.tokens)
         
         logger.info(f"Unsubscribed from {len(request.tokens)} instruments")
         
@@ -171,8 +166,7 @@ async def unsubscribe_instruments(request: SubscribeRequest):
 async def list_subscribed_instruments():
     """Get list of currently subscribed instruments."""
     try:
-        pool = await get_db_pool()
-        tokens = await SubscriptionQueries.get_subscribed_instruments(pool)
+        tokens = await SubscriptionService.get_subscribed_instruments()
         
         return {
             "success": True,
@@ -1,13 +1,54 @@
 """Instrument search API for Grafana integration."""
 
-from fastapi import APIRouter, Query
+import orjson
+from fastapi import APIRouter, Query, Response
 from typing import List, Dict
+from cachetools import TTLCache
 from loguru import logger
 
 from app.database.connection import get_db_pool
 
 router = APIRouter()
 
+# Grafana re-runs variable queries on every dashboard load; cache results.
+# Popular instruments are nearly static, so they live longer.
+_popular_cache: TTLCache = TTLCache(maxsize=16, ttl=600)
+_search_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+
+# Constant Grafana datasource payloads, serialized once
+_SEARCH_TARGETS_BODY = orjson.dumps(["instruments"])
+_EMPTY_QUERY_BODY = orjson.dumps([])
+_HEALTH_BODY = orjson.dumps({"status": "ok", "service": "instrument-search"})
+
+_POPULAR_SQL = """
+    SELECT display_text as text, token as value
+    FROM instruments
+    WHERE segment_rank <= 3
+        AND symbol IN (
+            'NIFTY 50', 'NIFTY BANK', 'SENSEX',
+            'RELIANCE', 'TCS', 'INFY', 'HDFCBANK', 'ICICIBANK',
+            'SBIN', 'KOTAKBANK', 'HDFC', 'BAJFINANCE'
+        )
+    ORDER BY segment_rank, symbol
+    LIMIT $1
+"""
+
+# Search by symbol (case-insensitive, supports partial match)
+_SEARCH_SQL = """
+    SELECT display_text as text, token as value
+    FROM instruments
+    WHERE 
+        symbol ILIKE '%' || $1 || '%'
+        AND segment_rank < 5
+    ORDER BY 
+        -- Prioritize exact matches
+        CASE WHEN symbol ILIKE $1 THEN 1 ELSE 2 END,
+        -- Then by segment importance, then alphabetically
+        segment_rank,
+        symbol
+    LIMIT $2
+"""
+
 
 @router.get("/instruments")
 async def search_instruments(
@@ -19,65 +60,33 @@ async def search_instruments(
 
     Returns format compatible with Grafana variable queries.
     """
+    popular = not q or len(q) < 2
+    if popular:
+        cache, key = _popular_cache, limit
+    else:
+        cache, key = _search_cache, (q.upper(), limit)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
     try:
         pool = await get_db_pool()
 
         # If no query, return popular instruments
-        if not q or len(q) < 2:
-            query = """
-                SELECT 
-                    CONCAT(symbol, ' - ', segment, ' (', exchange, ')') as text,
-                    token as value
-                FROM instruments
-                WHERE segment IN ('INDICES', 'NSE', 'NFO-FUT')
-                    AND symbol IN (
-                        'NIFTY 50', 'NIFTY BANK', 'SENSEX',
-                        'RELIANCE', 'TCS', 'INFY', 'HDFCBANK', 'ICICIBANK',
-                        'SBIN', 'KOTAKBANK', 'HDFC', 'BAJFINANCE'
-                    )
-                ORDER BY 
-                    CASE segment 
-                        WHEN 'INDICES' THEN 1
-                        WHEN 'NSE' THEN 2
-                        WHEN 'NFO-FUT' THEN 3
-                        ELSE 4
-                    END,
-                    symbol
-                LIMIT $1
-            """
+        if popular:
+            query = _POPULAR_SQL
             params = (limit,)
         else:
-            # Search by symbol (case-insensitive, supports partial match)
-            search_pattern = f"%{q.upper()}%"
-            query = """
-                SELECT 
-                    CONCAT(symbol, ' - ', segment, ' (', exchange, ')') as text,
-                    token as value
-                FROM instruments
-                WHERE 
-                    UPPER(symbol) LIKE $1
-                    AND segment IN ('INDICES', 'NSE', 'BSE', 'NFO-FUT')
-                ORDER BY 
-                    -- Prioritize exact matches
-                    CASE WHEN UPPER(symbol) = $2 THEN 1 ELSE 2 END,
-                    -- Then by segment importance
-                    CASE segment 
-                        WHEN 'INDICES' THEN 1
-                        WHEN 'NSE' THEN 2
-                        WHEN 'NFO-FUT' THEN 3
-                        WHEN 'BSE' THEN 4
-                        ELSE 5
-                    END,
-                    -- Then alphabetically
-                    symbol
-                LIMIT $3
-            """
-            params = (search_pattern, q.upper(), limit)
+            query = _SEARCH_SQL
+            params = (q, limit)
 
         async with pool.acquire() as conn:
-            rows = await conn.fetch(query, *params)
+            stmt = await conn.prepared(query)
+            rows = await stmt.fetch(*params)
 
         results = [{"text": row["text"], "value": str(row["value"])} for row in rows]
+        cache[key] = results
 
         logger.info(f"Instrument search: q='{q}' returned {len(results)} results")
         return results
@@ -88,24 +97,24 @@ async def search_instruments(
 
 
 @router.post("/search")
-async def grafana_search_target(body: Dict = None) -> List[str]:
+async def grafana_search_target(body: Dict = None) -> Response:
     """
     Grafana JSON datasource search endpoint.
     Returns list of available metrics/targets.
     """
-    return ["instruments"]
+    return Response(content=_SEARCH_TARGETS_BODY, media_type="application/json")
 
 
 @router.post("/query")
-async def grafana_query(body: Dict = None) -> List[Dict]:
+async def grafana_query(body: Dict = None) -> Response:
     """
     Grafana JSON datasource query endpoint.
     Not used for variables, but required for plugin compatibility.
     """
-    return []
+    return Response(content=_EMPTY_QUERY_BODY, media_type="application/json")
 
 
 @router.get("/")
-async def health():
+async def health() -> Response:
     """Health check for search API."""
-    return {"status": "ok", "service": "instrument-search"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
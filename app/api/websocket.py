@@ -1,62 +1,122 @@
 """WebSocket API endpoints for real-time data streaming."""
 
 import asyncio
-import json
-from typing import Dict, Set
+import orjson
+from typing import Any, Dict, List, Optional, Tuple
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from loguru import logger
 
-from app.brokers import get_broker
+from app.brokers import create_broker
+from app.config import settings
 from app.services.data_ingestion import data_ingestion_service
 from app.services.realtime_streaming import realtime_service
-from app.database.connection import get_db_pool
-from app.database.models import SubscriptionQueries
+from app.services.subscriptions import SubscriptionService
 
 
 router = APIRouter()
 
 
+def _dumps(message: Any) -> str:
+    """Serialize a message for a text frame."""
+    return orjson.dumps(
+        message, default=str, option=orjson.OPT_NON_STR_KEYS
+    ).decode()
+
+
+# Constant replies to client commands, serialized once
+_PONG = _dumps({"type": "pong"})
+_INVALID_JSON = _dumps({"type": "error", "message": "Invalid JSON"})
+_TICKS_PREFIX = '{"type":"ticks","data":'
+
+
 class ConnectionManager:
     """Manage WebSocket connections."""
 
+    # Messages buffered per client before the oldest are dropped
+    SEND_QUEUE_SIZE = 256
+
     def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
+        self.active_connections: Dict[WebSocket, asyncio.Queue] = {}
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
+        # Snapshot of the queues, rebuilt on connect/disconnect, for broadcast
+        self._queues: Tuple[asyncio.Queue, ...] = ()
+        self._pending_ticks: List[Dict] = []
+        self._tick_flusher: Optional[asyncio.Task] = None
         self.broker_connected = False
         self.broker_task = None
+        # Own broker socket, independent of the auto-streaming service's
+        self.broker = None
 
     async def connect(self, websocket: WebSocket):
         """Accept and register a WebSocket connection."""
         await websocket.accept()
-        self.active_connections.add(websocket)
+        queue = asyncio.Queue(maxsize=self.SEND_QUEUE_SIZE)
+        self.active_connections[websocket] = queue
+        self._queues = tuple(self.active_connections.values())
+        self._writers[websocket] = asyncio.create_task(
+            self._writer(websocket, queue)
+        )
         logger.info(
-            f"Client connected. Total connections: {len(self.active_connections)}"
+            "Client connected. Total connections: {}", len(self.active_connections)
         )
 
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection."""
-        self.active_connections.discard(websocket)
+        if self.active_connections.pop(websocket, None) is None:
+            return
+        self._queues = tuple(self.active_connections.values())
+
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+
         logger.info(
-            f"Client disconnected. Total connections: {len(self.active_connections)}"
+            "Client disconnected. Total connections: {}",
+            len(self.active_connections),
         )
 
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Drain one client's queue so slow sockets only delay themselves."""
+        try:
+            while True:
+                message_json = await queue.get()
+                await websocket.send_text(message_json)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Failed to send to client: {}", e)
+            self.disconnect(websocket)
+
     async def broadcast(self, message: Dict):
         """Broadcast message to all connected clients."""
-        if not self.active_connections:
-            return
-
-        message_json = json.dumps(message, default=str)
-        disconnected = set()
+        if self._queues:
+            self._enqueue(_dumps(message))
 
-        for connection in self.active_connections:
+    def _enqueue(self, message_json: str):
+        """Queue an already serialized message for every client."""
+        for queue in self._queues:
             try:
-                await connection.send_text(message_json)
-            except Exception as e:
-                logger.error(f"Failed to send to client: {e}")
-                disconnected.add(connection)
-
-        # Remove disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
+                queue.put_nowait(message_json)
+            except asyncio.QueueFull:
+                # Slow client: drop its oldest message to make room
+                queue.get_nowait()
+                queue.put_nowait(message_json)
+
+    async def _flush_ticks(self):
+        """Broadcast ticks collected over each coalescing window as one message."""
+        interval = settings.tick_broadcast_interval_ms / 1000
+        while True:
+            await asyncio.sleep(interval)
+            if self._pending_ticks:
+                batch, self._pending_ticks = self._pending_ticks, []
+                if self._queues:
+                    try:
+                        # Splice the encoded batch into a constant envelope
+                        # rather than wrapping it in a dict per flush
+                        self._enqueue(f"{_TICKS_PREFIX}{_dumps(batch)}}}")
+                    except Exception as e:
+                        # Drop the bad batch; the flusher must keep draining
+                        logger.error("Failed to broadcast tick batch: {}", e)
 
     async def start_broker_connection(self):
         """Start broker WebSocket connection."""
@@ -66,8 +126,7 @@ class ConnectionManager:
 
         try:
             # Get subscribed instruments
-            pool = await get_db_pool()
-            tokens = await SubscriptionQueries.get_subscribed_instruments(pool)
+            tokens = await SubscriptionService.get_subscribed_instruments()
 
             if not tokens:
                 logger.warning(
@@ -76,22 +135,25 @@ class ConnectionManager:
                 return
 
             # Connect to broker
-            broker = get_broker()
+            if self.broker is None:
+                self.broker = create_broker()
 
             async def tick_callback(tick_data: Dict):
                 """Handle incoming ticks from broker."""
-                # Store in database
-                await data_ingestion_service.handle_tick(tick_data)
+                # Queue for the next coalesced broadcast to connected clients
+                self._pending_ticks.append(tick_data)
 
-                # Broadcast to connected clients
-                await self.broadcast({"type": "tick", "data": tick_data})
+                # Buffer for the database (flushes in the background)
+                await data_ingestion_service.handle_tick(tick_data)
 
-            await broker.connect_websocket(tokens, tick_callback)
+            await self.broker.connect_websocket(tokens, tick_callback)
             self.broker_connected = True
-            logger.info(f"Broker WebSocket connected with {len(tokens)} instruments")
+            if self._tick_flusher is None or self._tick_flusher.done():
+                self._tick_flusher = asyncio.create_task(self._flush_ticks())
+            logger.info("Broker WebSocket connected with {} instruments", len(tokens))
 
         except Exception as e:
-            logger.error(f"Failed to connect to broker WebSocket: {e}")
+            logger.error("Failed to connect to broker WebSocket: {}", e)
             self.broker_connected = False
             raise
 
@@ -101,18 +163,43 @@ class ConnectionManager:
             return
 
         try:
-            broker = get_broker()
-            await broker.disconnect_websocket()
+            await self.broker.disconnect_websocket()
             self.broker_connected = False
+            if self._tick_flusher is not None:
+                self._tick_flusher.cancel()
+                self._tick_flusher = None
+            self._pending_ticks = []
             logger.info("Broker WebSocket disconnected")
         except Exception as e:
-            logger.error(f"Failed to disconnect broker WebSocket: {e}")
+            logger.error("Failed to disconnect broker WebSocket: {}", e)
 
 
 # Global connection manager
 connection_manager = ConnectionManager()
 
 
+def _status(command: str) -> str:
+    """Reply to a status command."""
+    return _dumps(
+        {
+            "type": "status",
+            "broker_connected": connection_manager.broker_connected,
+            "active_connections": len(connection_manager.active_connections),
+        }
+    )
+
+
+def _unknown_command(command: str) -> str:
+    """Reply to an unrecognised command."""
+    return _dumps({"type": "error", "message": f"Unknown command: {command}"})
+
+
+_COMMAND_HANDLERS = {
+    "ping": lambda command: _PONG,
+    "status": _status,
+}
+
+
 @router.websocket("/ticks")
 async def websocket_endpoint(websocket: WebSocket):
     """
@@ -129,7 +216,7 @@ async def websocket_endpoint(websocket: WebSocket):
             await connection_manager.start_broker_connection()
         except Exception as e:
             await websocket.send_text(
-                json.dumps(
+                _dumps(
                     {
                         "type": "error",
                         "message": f"Failed to connect to broker: {str(e)}",
@@ -140,38 +227,22 @@ async def websocket_endpoint(websocket: WebSocket):
     try:
         # Keep connection alive and listen for client messages
         while True:
-            data = await websocket.receive_text()
+            # Take the raw frame: orjson parses binary frames without a
+            # decode step, and text frames (browsers) are passed as-is
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            data = frame.get("bytes") or frame.get("text") or ""
 
             # Handle client commands
             try:
-                message = json.loads(data)
+                message = orjson.loads(data)
                 command = message.get("command")
+                handler = _COMMAND_HANDLERS.get(command, _unknown_command)
+                await websocket.send_text(handler(command))
 
-                if command == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
-                elif command == "status":
-                    await websocket.send_text(
-                        json.dumps(
-                            {
-                                "type": "status",
-                                "broker_connected": connection_manager.broker_connected,
-                                "active_connections": len(
-                                    connection_manager.active_connections
-                                ),
-                            }
-                        )
-                    )
-                else:
-                    await websocket.send_text(
-                        json.dumps(
-                            {"type": "error", "message": f"Unknown command: {command}"}
-                        )
-                    )
-
-            except json.JSONDecodeError:
-                await websocket.send_text(
-                    json.dumps({"type": "error", "message": "Invalid JSON"})
-                )
+            except orjson.JSONDecodeError:
+                await websocket.send_text(_INVALID_JSON)
 
     except WebSocketDisconnect:
         connection_manager.disconnect(websocket)
@@ -182,7 +253,7 @@ async def websocket_endpoint(websocket: WebSocket):
             await connection_manager.stop_broker_connection()
 
     except Exception as e:
-        logger.error(f"WebSocket error: {e}")
+        logger.error("WebSocket error: {}", e)
         connection_manager.disconnect(websocket)
 
 
@@ -193,7 +264,7 @@ async def start_streaming():
         await connection_manager.start_broker_connection()
         return {"success": True, "message": "Broker WebSocket connection started"}
     except Exception as e:
-        logger.error(f"Failed to start streaming: {e}")
+        logger.error("Failed to start streaming: {}", e)
         return {"success": False, "message": str(e)}
 
 
@@ -204,7 +275,7 @@ async def stop_streaming():
         await connection_manager.stop_broker_connection()
         return {"success": True, "message": "Broker WebSocket connection stopped"}
     except Exception as e:
-        logger.error(f"Failed to stop streaming: {e}")
+        logger.error("Failed to stop streaming: {}", e)
         return {"success": False, "message": str(e)}
 
 
@@ -232,5 +303,5 @@ async def restart_streaming():
         await realtime_service.start_streaming()
         return {"success": True, "message": "Real-time streaming restarted"}
     except Exception as e:
-        logger.error(f"Failed to restart streaming: {e}")
+        logger.error("Failed to restart streaming: {}", e)
         return {"success": False, "message": str(e)}
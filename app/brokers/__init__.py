@@ -1,16 +1,36 @@
 """Broker interface implementations."""
+from functools import lru_cache
+from importlib import import_module
+
 from app.brokers.base import BrokerInterface
-from app.brokers.kite import KiteBroker
-from app.brokers.fyers import FyersBroker
 from app.config import settings
 
+# Broker name -> (module, class); only the configured broker's module (and SDK)
+# is ever imported
+BROKERS = {
+    "kite": ("app.brokers.kite", "KiteBroker"),
+    "fyers": ("app.brokers.fyers", "FyersBroker"),
+}
 
-def get_broker() -> BrokerInterface:
-    """Get broker instance based on configuration."""
-    if settings.broker.lower() == "kite":
-        return KiteBroker()
-    elif settings.broker.lower() == "fyers":
-        return FyersBroker()
-    else:
+
+def create_broker() -> BrokerInterface:
+    """
+    Create a new instance of the configured broker.
+
+    Each WebSocket consumer (auto-streaming, the /ws tick relay) owns one,
+    so connecting or stopping one socket never touches another's.
+    """
+    try:
+        module_name, class_name = BROKERS[settings.broker.lower()]
+    except KeyError:
         raise ValueError(f"Unknown broker: {settings.broker}")
+    return getattr(import_module(module_name), class_name)()
+
 
+@lru_cache(maxsize=1)
+def get_broker() -> BrokerInterface:
+    """
+    Get the shared broker instance for REST calls (auth, instruments,
+    historical data). Streaming consumers use create_broker() instead.
+    """
+    return create_broker()
@@ -1,6 +1,7 @@
 """Broker authentication modules."""
 from app.brokers.auth.base import BrokerAuthBase
+from app.brokers.auth.http_client import get_http_client, close_http_client
 from app.brokers.auth.kite_auth import KiteAuth
 
-__all__ = ["BrokerAuthBase", "KiteAuth"]
+__all__ = ["BrokerAuthBase", "KiteAuth", "get_http_client", "close_http_client"]
 
@@ -1,10 +1,14 @@
 """Base class for broker authentication."""
 
+import time
 from abc import ABC, abstractmethod
 from typing import Optional, Dict
-from datetime import datetime, timedelta
+from datetime import datetime
 from loguru import logger
 
+# Refresh tokens this long before they actually expire
+TOKEN_REFRESH_BUFFER_SECONDS = 300
+
 
 class BrokerAuthBase(ABC):
     """Base class for broker authentication."""
@@ -14,6 +18,19 @@ class BrokerAuthBase(ABC):
         self.token_expires_at: Optional[datetime] = None
         self.user_id: Optional[str] = None
 
+    @property
+    def token_expires_at(self) -> Optional[datetime]:
+        """Token expiry time."""
+        return self._token_expires_at
+
+    @token_expires_at.setter
+    def token_expires_at(self, value: Optional[datetime]):
+        self._token_expires_at = value
+        # Precompute the refresh deadline so validity checks are a float compare
+        self._refresh_at_ts: Optional[float] = (
+            value.timestamp() - TOKEN_REFRESH_BUFFER_SECONDS if value else None
+        )
+
     @abstractmethod
     async def authenticate(self) -> Dict:
         """
@@ -32,17 +49,17 @@ class BrokerAuthBase(ABC):
         if not self.access_token:
             return False
 
-        if not self.token_expires_at:
+        if self._refresh_at_ts is None:
             return True  # No expiry set, assume valid
 
-        # Add 5 minute buffer before expiry
-        return datetime.now() < (self.token_expires_at - timedelta(minutes=5))
+        # 5 minute buffer before expiry is folded into the deadline
+        return time.time() < self._refresh_at_ts
 
     async def get_valid_token(self) -> str:
         """Get a valid access token, refreshing if necessary."""
         if self.is_token_valid():
             logger.info(
-                f"Using existing valid token (expires: {self.token_expires_at})"
+                "Using existing valid token (expires: {})", self.token_expires_at
             )
             return self.access_token
 
@@ -53,7 +70,7 @@ class BrokerAuthBase(ABC):
         self.user_id = result.get("user_id")
         self.token_expires_at = result.get("expires_at")
 
-        logger.info(f"✓ Authentication successful for user: {self.user_id}")
-        logger.info(f"✓ Token expires at: {self.token_expires_at}")
+        logger.info("✓ Authentication successful for user: {}", self.user_id)
+        logger.info("✓ Token expires at: {}", self.token_expires_at)
 
         return self.access_token
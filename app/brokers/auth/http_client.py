@@ -0,0 +1,31 @@
+"""Shared HTTP client for broker REST calls."""
+
+import httpx
+from typing import Optional
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide HTTP client, creating it on first use.
+
+    Keep-alive connections (HTTP/2 where the server supports it) are shared
+    by every auth handler, so re-auth doesn't pay a fresh TLS handshake.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=4),
+        )
+    return _client
+
+
+async def close_http_client():
+    """Close the shared HTTP client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
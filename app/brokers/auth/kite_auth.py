@@ -1,20 +1,34 @@
 """Kite Connect automatic authentication."""
 
+import asyncio
+import fcntl
 import hashlib
+import orjson
 import pyotp
-import requests
-import json
 import os
+import time
 from pathlib import Path
 from typing import Dict, Optional
 from datetime import datetime, timedelta
 from urllib.parse import urlparse, parse_qs
 from loguru import logger
 
-from app.brokers.auth.base import BrokerAuthBase
+from app.brokers.auth.base import BrokerAuthBase, TOKEN_REFRESH_BUFFER_SECONDS
+from app.brokers.auth.http_client import get_http_client
+from app.utils.redis_client import redis_client
 
 # Token cache file
 TOKEN_CACHE_FILE = Path("/tmp/.kite_token_cache.json")
+# Held while logging in so concurrent workers don't all re-authenticate
+TOKEN_LOCK_FILE = Path("/tmp/.kite_token_cache.lock")
+
+# Same cache shared through Redis, for workers on other hosts; the lock key
+# plays the part of TOKEN_LOCK_FILE across hosts
+TOKEN_CACHE_KEY = "kite:access_token"
+TOKEN_LOCK_KEY = "kite:login_lock"
+# Longest a login may hold the Redis lock (and others wait for its token)
+LOGIN_LOCK_SECONDS = 120
+LOGIN_WAIT_POLL_SECONDS = 2
 
 
 class KiteAuth(BrokerAuthBase):
@@ -31,20 +45,23 @@ class KiteAuth(BrokerAuthBase):
     ):
         self.api_key = api_key
         self.api_secret = api_secret
+        self._api_key_bytes = api_key.encode()
+        self._api_secret_bytes = api_secret.encode()
         self.username = username
         self.password = password
         self.totp_key = totp_key
-        self.http_session = requests.Session()
+        self._totp = pyotp.TOTP(totp_key)
+        self.http_session = get_http_client()
 
         # Try to load cached token first
         cached_expiry = None
         cached = self._load_token_cache()
-        if cached and cached.get("access_token") and cached.get("expires_at"):
-            expires_at = datetime.fromisoformat(cached["expires_at"])
-            if datetime.now() < expires_at:
+        if cached and cached.get("access_token") and cached.get("expires_at_ts"):
+            if time.time() < cached["expires_at_ts"]:
+                expires_at = datetime.fromtimestamp(cached["expires_at_ts"])
                 access_token = cached["access_token"]
                 cached_expiry = expires_at
-                logger.info(f"🔑 Loaded cached token (expires: {expires_at})")
+                logger.info("🔑 Loaded cached token (expires: {})", expires_at)
 
         super().__init__(access_token)  # Pass token to parent
 
@@ -53,31 +70,108 @@ class KiteAuth(BrokerAuthBase):
             self.token_expires_at = cached_expiry
         elif access_token:
             self.token_expires_at = self._calculate_token_expiry()
-            logger.info(f"🔑 Using token (expires: {self.token_expires_at})")
+            logger.info("🔑 Using token (expires: {})", self.token_expires_at)
 
     def _load_token_cache(self) -> Optional[Dict]:
         """Load cached token from file."""
         try:
             if TOKEN_CACHE_FILE.exists():
-                with open(TOKEN_CACHE_FILE, "r") as f:
-                    return json.load(f)
+                return orjson.loads(TOKEN_CACHE_FILE.read_bytes())
         except Exception as e:
-            logger.warning(f"Failed to load token cache: {e}")
+            logger.warning("Failed to load token cache: {}", e)
         return None
 
     def _save_token_cache(self, access_token: str, expires_at: datetime, user_id: str):
-        """Save token to cache file."""
+        """Save token to cache file (atomically, so a crash can't corrupt it)."""
         try:
             cache = {
                 "access_token": access_token,
-                "expires_at": expires_at.isoformat(),
+                "expires_at_ts": expires_at.timestamp(),
                 "user_id": user_id,
             }
-            with open(TOKEN_CACHE_FILE, "w") as f:
-                json.dump(cache, f)
-            logger.info(f"Token cached to {TOKEN_CACHE_FILE}")
+            tmp_file = TOKEN_CACHE_FILE.with_suffix(".tmp")
+            tmp_file.write_bytes(orjson.dumps(cache))
+            os.replace(tmp_file, TOKEN_CACHE_FILE)
+            logger.info("Token cached to {}", TOKEN_CACHE_FILE)
+        except Exception as e:
+            logger.warning("Failed to save token cache: {}", e)
+
+    @staticmethod
+    def _is_fresh(cached: Optional[Dict]) -> bool:
+        """Check that a cached token isn't due for refresh yet."""
+        return bool(
+            cached
+            and cached.get("access_token")
+            and cached.get("expires_at_ts")
+            and time.time() < cached["expires_at_ts"] - TOKEN_REFRESH_BUFFER_SECONDS
+        )
+
+    @staticmethod
+    def _token_result(cached: Dict) -> Dict:
+        """Build an authenticate() result from a cache entry."""
+        return {
+            "access_token": cached["access_token"],
+            "user_id": cached.get("user_id"),
+            "expires_at": datetime.fromtimestamp(cached["expires_at_ts"]),
+        }
+
+    async def _load_shared_token(self) -> Optional[Dict]:
+        """Load the token cached in Redis (None if Redis isn't available)."""
+        try:
+            return await redis_client.get_json(TOKEN_CACHE_KEY)
+        except Exception as e:
+            logger.debug("Redis token cache unavailable: {}", e)
+            return None
+
+    async def _save_shared_token(
+        self, access_token: str, expires_at: datetime, user_id: str
+    ):
+        """Cache the token in Redis until it expires."""
+        ttl = int(expires_at.timestamp() - time.time())
+        if ttl <= 0:
+            return
+        cache = {
+            "access_token": access_token,
+            "expires_at_ts": expires_at.timestamp(),
+            "user_id": user_id,
+        }
+        try:
+            await redis_client.set_json(TOKEN_CACHE_KEY, cache, ex=ttl)
+        except Exception as e:
+            logger.debug("Redis token cache unavailable: {}", e)
+
+    async def _acquire_login_lock(self) -> Optional[bool]:
+        """
+        Take the cross-host login lock.
+
+        Returns:
+            True if taken, False if another worker holds it, None if Redis
+            isn't available (the file lock still applies)
+        """
+        try:
+            return await redis_client.set_nx(
+                TOKEN_LOCK_KEY, str(os.getpid()), ex=LOGIN_LOCK_SECONDS
+            )
         except Exception as e:
-            logger.warning(f"Failed to save token cache: {e}")
+            logger.debug("Redis login lock unavailable: {}", e)
+            return None
+
+    async def _release_login_lock(self):
+        """Release the cross-host login lock."""
+        try:
+            await redis_client.delete(TOKEN_LOCK_KEY)
+        except Exception as e:
+            logger.debug("Redis login lock unavailable: {}", e)
+
+    async def _wait_for_shared_token(self) -> Optional[Dict]:
+        """Wait for the worker holding the login lock to publish its token."""
+        deadline = time.monotonic() + LOGIN_LOCK_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOGIN_WAIT_POLL_SECONDS)
+            cached = await self._load_shared_token()
+            if self._is_fresh(cached):
+                return cached
+        return None
 
     def _calculate_token_expiry(self) -> datetime:
         """Calculate when the Kite token expires (next day 8:30 AM IST = 3:00 AM UTC)."""
@@ -95,7 +189,49 @@ class KiteAuth(BrokerAuthBase):
 
     async def authenticate(self) -> Dict:
         """
-        Authenticate with Kite Connect using credentials and TOTP.
+        Authenticate with Kite Connect, or reuse a token another worker just cached.
+
+        A token cached in Redis (by a worker on any host) is used first.
+        Otherwise logins are serialized across processes with an advisory
+        lock on TOKEN_LOCK_FILE, and across hosts with a Redis SET NX lock;
+        the caches are re-checked under the locks so only the first worker
+        actually logs in.
+
+        Returns:
+            Dict with access_token, user_id, and expires_at
+        """
+        cached = await self._load_shared_token()
+        if self._is_fresh(cached):
+            logger.info("🔑 Reusing token cached in Redis")
+            return self._token_result(cached)
+
+        with open(TOKEN_LOCK_FILE, "w") as lock_file:
+            # flock blocks, so wait for it off the event loop
+            await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+
+            cached = self._load_token_cache()
+            if self._is_fresh(cached):
+                logger.info("🔑 Reusing token refreshed by another worker")
+                return self._token_result(cached)
+
+            locked = await self._acquire_login_lock()
+            if locked is False:
+                # Another host is logging in; use its token once it lands
+                cached = await self._wait_for_shared_token()
+                if cached:
+                    logger.info("🔑 Reusing token refreshed by another host")
+                    return self._token_result(cached)
+
+            # Lock file is released when the file is closed
+            try:
+                return await self._login()
+            finally:
+                if locked:
+                    await self._release_login_lock()
+
+    async def _login(self) -> Dict:
+        """
+        Log in to Kite Connect using credentials and TOTP.
 
         Returns:
             Dict with access_token, user_id, and expires_at
@@ -105,12 +241,12 @@ class KiteAuth(BrokerAuthBase):
 
             # Step 1: Get login URL
             login_url = f"https://kite.trade/connect/login?v=3&api_key={self.api_key}"
-            initial_response = self.http_session.get(url=login_url)
+            initial_response = await self.http_session.get(url=login_url)
             logger.info("✓ Retrieved login page")
 
             # Step 2: Login with credentials
-            logger.info(f"🔑 Logging in as: {self.username}")
-            login_response = self.http_session.post(
+            logger.info("🔑 Logging in as: {}", self.username)
+            login_response = await self.http_session.post(
                 url="https://kite.zerodha.com/api/login",
                 data={"user_id": self.username, "password": self.password},
             )
@@ -130,10 +266,10 @@ class KiteAuth(BrokerAuthBase):
             logger.info("✓ Login successful")
 
             # Step 3: Complete 2FA with TOTP
-            totp_token = pyotp.TOTP(self.totp_key).now()
-            logger.info(f"🔐 Completing 2FA (TOTP: {totp_token})")
+            totp_token = self._totp.now()
+            logger.info("🔐 Completing 2FA (TOTP: {})", totp_token)
 
-            twofa_response = self.http_session.post(
+            twofa_response = await self.http_session.post(
                 url="https://kite.zerodha.com/api/twofa",
                 data={
                     "user_id": self.username,
@@ -155,8 +291,10 @@ class KiteAuth(BrokerAuthBase):
 
             # Step 4: Get request_token from redirect
             final_url = f"{login_url}&skip_session=true"
-            final_response = self.http_session.get(url=final_url, allow_redirects=True)
-            callback_url = final_response.url
+            final_response = await self.http_session.get(
+                url=final_url, follow_redirects=True
+            )
+            callback_url = str(final_response.url)
 
             # Extract request_token
             parsed_url = urlparse(callback_url)
@@ -166,14 +304,14 @@ class KiteAuth(BrokerAuthBase):
                 raise Exception("request_token not found in callback URL")
 
             request_token = query_params["request_token"][0]
-            logger.info(f"✓ Extracted request_token: {request_token[:20]}...")
+            logger.info("✓ Extracted request_token: {}...", request_token[:20])
 
             # Step 5: Exchange request_token for access_token
             checksum = hashlib.sha256(
-                f"{self.api_key}{request_token}{self.api_secret}".encode()
+                self._api_key_bytes + request_token.encode() + self._api_secret_bytes
             ).hexdigest()
 
-            token_response = requests.post(
+            token_response = await self.http_session.post(
                 url="https://api.kite.trade/session/token",
                 data={
                     "api_key": self.api_key,
@@ -193,10 +331,11 @@ class KiteAuth(BrokerAuthBase):
 
             # Save to cache
             self._save_token_cache(access_token, expires_at, user_id)
+            await self._save_shared_token(access_token, expires_at, user_id)
 
-            logger.info(f"✅ Authentication successful!")
-            logger.info(f"   User: {user_id}")
-            logger.info(f"   Token: {access_token[:20]}...")
+            logger.info("✅ Authentication successful!")
+            logger.info("   User: {}", user_id)
+            logger.info("   Token: {}...", access_token[:20])
 
             return {
                 "access_token": access_token,
@@ -205,5 +344,5 @@ class KiteAuth(BrokerAuthBase):
             }
 
         except Exception as e:
-            logger.error(f"❌ Kite authentication failed: {e}")
+            logger.error("❌ Kite authentication failed: {}", e)
             raise
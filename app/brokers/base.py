@@ -1,14 +1,19 @@
-"""Abstract broker interface."""
+"""Broker interface."""
 
-from abc import ABC, abstractmethod
-from typing import List, Dict, Callable, Optional
+from typing import List, Dict, Callable, Optional, Protocol
 from datetime import datetime
 
 
-class BrokerInterface(ABC):
-    """Base interface for broker implementations."""
+class BrokerInterface(Protocol):
+    """
+    Structural interface for broker implementations.
+
+    Concrete brokers subclass it explicitly and declare their own
+    ``__slots__``; the empty slots here keep instances dict-free.
+    """
+
+    __slots__ = ()
 
-    @abstractmethod
     async def connect_websocket(self, instruments: List[int], callback: Callable):
         """
         Connect to broker WebSocket and stream tick data.
@@ -17,24 +22,20 @@ class BrokerInterface(ABC):
             instruments: List of instrument tokens to subscribe
             callback: Callback function to handle incoming ticks
         """
-        pass
+        ...
 
-    @abstractmethod
     async def disconnect_websocket(self):
         """Disconnect from WebSocket."""
-        pass
+        ...
 
-    @abstractmethod
     async def subscribe(self, instruments: List[int]):
         """Subscribe to instruments."""
-        pass
+        ...
 
-    @abstractmethod
     async def unsubscribe(self, instruments: List[int]):
         """Unsubscribe from instruments."""
-        pass
+        ...
 
-    @abstractmethod
     async def fetch_historical_candles(
         self,
         instrument_token: int,
@@ -54,9 +55,8 @@ class BrokerInterface(ABC):
         Returns:
             List of candle dictionaries with 'time', 'open', 'high', 'low', 'close', 'volume', 'open_interest'
         """
-        pass
+        ...
 
-    @abstractmethod
     async def get_instruments(self) -> List[Dict]:
         """
         Fetch instrument master list from broker.
@@ -64,9 +64,8 @@ class BrokerInterface(ABC):
         Returns:
             List of instrument dictionaries
         """
-        pass
+        ...
 
-    @abstractmethod
     async def get_quote(self, instruments: List[int]) -> Dict:
         """
         Get current quote for instruments.
@@ -77,4 +76,4 @@ class BrokerInterface(ABC):
         Returns:
             Dictionary of quotes keyed by instrument token
         """
-        pass
+        ...
@@ -1,26 +1,55 @@
 """Fyers API broker implementation."""
 import asyncio
-from typing import List, Dict, Callable, Optional
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Callable, Optional, Set
+from datetime import datetime, timezone
 from loguru import logger
+import numpy as np
+import pandas as pd
 
-try:
-    from fyers_apiv3 import fyersModel
-    from fyers_apiv3.FyersWebsocket import data_ws
-except ImportError:
-    fyersModel = None
-    data_ws = None
+# Imported on first FyersBroker() by _import_sdk
+fyersModel = None
+data_ws = None
 
 from app.brokers.base import BrokerInterface
 from app.config import settings
+from app.utils.dates import is_market_open
+
+
+def _import_sdk():
+    """Import fyers-apiv3 on first use so unused brokers cost nothing."""
+    global fyersModel, data_ws
+    if fyersModel is None:
+        try:
+            from fyers_apiv3 import fyersModel
+            from fyers_apiv3.FyersWebsocket import data_ws
+        except ImportError as e:
+            raise ImportError("fyers-apiv3 package not installed. Install with: pip install fyers-apiv3") from e
 
 
 class FyersBroker(BrokerInterface):
     """Fyers API implementation."""
     
+    __slots__ = (
+        "client_id",
+        "access_token",
+        "fyers",
+        "ws",
+        "callback",
+        "_subscribed_instruments",
+        "_asyncio_loop",
+        "_tick_queue",
+        "_tick_consumer",
+        "dropped_ticks",
+        "_io_pool",
+        "_last_tick_ts",
+        "_heartbeat_task",
+        "_symbol_cache",
+    )
+    
     def __init__(self):
-        if not fyersModel or not data_ws:
-            raise ImportError("fyers-apiv3 package not installed. Install with: pip install fyers-apiv3")
+        _import_sdk()
         
         if not settings.fyers_app_id or not settings.fyers_access_token:
             raise ValueError("Fyers API credentials not configured")
@@ -34,23 +63,72 @@ class FyersBroker(BrokerInterface):
         )
         self.ws: Optional[data_ws.FyersDataSocket] = None
         self.callback: Optional[Callable] = None
-        self._subscribed_instruments: List[str] = []
+        self._subscribed_instruments: Set[str] = set()
+        self._asyncio_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tick_queue: asyncio.Queue = asyncio.Queue(
+            maxsize=settings.tick_buffer_size
+        )
+        self._tick_consumer: Optional[asyncio.Task] = None
+        self.dropped_ticks = 0
+        # Monotonic time of the last tick, watched by the heartbeat
+        self._last_tick_ts = 0.0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # Token -> symbol string, reused across subscribe/quote calls
+        self._symbol_cache: Dict[int, str] = {}
+        # Dedicated threads for blocking SDK calls, separate from the default executor
+        self._io_pool = ThreadPoolExecutor(
+            max_workers=settings.broker_io_threads, thread_name_prefix="fyers-io"
+        )
         
         logger.info("Fyers broker initialized")
     
+    def _to_symbols(self, instruments: List[int]) -> List[str]:
+        """Map instrument tokens to Fyers symbol strings, memoized per token."""
+        cache = self._symbol_cache
+        symbols = []
+        for token in instruments:
+            symbol = cache.get(token)
+            if symbol is None:
+                symbol = cache[token] = str(token)
+            symbols.append(symbol)
+        return symbols
+    
     async def connect_websocket(self, instruments: List[int], callback: Callable):
         """Connect to Fyers WebSocket."""
         self.callback = callback
+        self._asyncio_loop = asyncio.get_running_loop()
         
         # Convert instrument tokens to Fyers format (needs to be mapped)
         # For now, assuming instruments are already in Fyers format
-        fyers_symbols = [str(i) for i in instruments]
-        self._subscribed_instruments = fyers_symbols
+        fyers_symbols = self._to_symbols(instruments)
+        self._subscribed_instruments = set(fyers_symbols)
         
+        # A repeated connect replaces the socket rather than leaking it
+        if self.ws:
+            self.ws.close()
+        self.ws = self._build_socket()
+        
+        if self._tick_consumer is None or self._tick_consumer.done():
+            self._tick_consumer = asyncio.create_task(self._consume_ticks())
+        
+        # Connect in background
+        await asyncio.get_running_loop().run_in_executor(
+            self._io_pool, self.ws.connect
+        )
+        self._last_tick_ts = time.monotonic()
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        logger.info("Fyers WebSocket connection established")
+    
+    def _build_socket(self) -> "data_ws.FyersDataSocket":
+        """Create a data socket wired to this broker's callbacks and symbols."""
         def on_message(message):
             """Handle incoming messages."""
             if self.callback and isinstance(message, dict):
-                asyncio.create_task(self._process_tick(message))
+                # Runs on the SDK's thread: hand off to the asyncio consumer
+                self._asyncio_loop.call_soon_threadsafe(
+                    self._enqueue_tick, message
+                )
         
         def on_error(error):
             """Handle errors."""
@@ -64,30 +142,85 @@ class FyersBroker(BrokerInterface):
             """Handle connection."""
             logger.info("Fyers WebSocket connected")
         
-        self.ws = data_ws.FyersDataSocket(
+        ws = data_ws.FyersDataSocket(
             access_token=self.access_token,
             run_background=False,
             log_path=""
         )
         
-        self.ws.on_message = on_message
-        self.ws.on_error = on_error
-        self.ws.on_close = on_close
-        self.ws.on_open = on_open
+        ws.on_message = on_message
+        ws.on_error = on_error
+        ws.on_close = on_close
+        ws.on_open = on_open
         
         # Subscribe to data
         data_type = "SymbolUpdate"
-        self.ws.subscribe(symbols=fyers_symbols, data_type=data_type)
+        ws.subscribe(symbols=list(self._subscribed_instruments), data_type=data_type)
+        return ws
+    
+    async def _heartbeat(self):
+        """
+        Replace the socket when ticks stop arriving during market hours.
         
-        # Connect in background
-        await asyncio.get_event_loop().run_in_executor(None, self.ws.connect)
-        logger.info("Fyers WebSocket connection established")
+        Repeated silence after a reconnect (e.g. an exchange holiday)
+        backs off up to 5 minutes.
+        """
+        stale_after = settings.ws_stale_after_seconds
+        while True:
+            await asyncio.sleep(settings.ws_heartbeat_interval_seconds)
+            silence = time.monotonic() - self._last_tick_ts
+            if silence < stale_after:
+                stale_after = settings.ws_stale_after_seconds
+                continue
+            if not is_market_open():
+                continue
+            
+            logger.warning(f"No Fyers ticks for {silence:.0f}s, reconnecting")
+            try:
+                await self._reconnect()
+            except Exception as e:
+                logger.error(f"Fyers WebSocket reconnect failed: {e}")
+            self._last_tick_ts = time.monotonic()
+            stale_after = min(stale_after * 2, 300)
     
-    async def _process_tick(self, tick: Dict):
+    async def _reconnect(self):
+        """Connect a fresh socket, then retire the stale one."""
+        stale = self.ws
+        self.ws = self._build_socket()
+        await asyncio.get_running_loop().run_in_executor(
+            self._io_pool, self.ws.connect
+        )
+        if stale:
+            stale.close()
+        logger.info("Fyers WebSocket reconnected")
+    
+    def _enqueue_tick(self, tick: Dict):
+        """Queue a tick for the consumer (runs on the event loop)."""
+        self._last_tick_ts = time.monotonic()
+        try:
+            self._tick_queue.put_nowait(tick)
+        except asyncio.QueueFull:
+            # Consumer is behind: drop the oldest tick to stay bounded
+            self._tick_queue.get_nowait()
+            self._tick_queue.put_nowait(tick)
+            self.dropped_ticks += 1
+    
+    async def _consume_ticks(self):
+        """Process queued ticks in arrival order."""
+        queue = self._tick_queue
+        while True:
+            tick = await queue.get()
+            # Ticks that queued up together share one timestamp
+            batch_time = datetime.now(timezone.utc)
+            await self._process_tick(tick, batch_time)
+            while not queue.empty():
+                await self._process_tick(queue.get_nowait(), batch_time)
+    
+    async def _process_tick(self, tick: Dict, tick_time: datetime):
         """Process and forward tick to callback."""
         try:
             tick_data = {
-                'time': datetime.now(),
+                'time': tick_time,
                 'instrument_token': tick.get('symbol'),
                 'ltp': tick.get('ltp'),
                 'volume': tick.get('vol_traded_today'),
@@ -99,30 +232,39 @@ class FyersBroker(BrokerInterface):
             }
             await self.callback(tick_data)
         except Exception as e:
-            logger.error(f"Error processing Fyers tick: {e}")
+            logger.error("Error processing Fyers tick: {}", e)
     
     async def disconnect_websocket(self):
         """Disconnect from WebSocket."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
         if self.ws:
             self.ws.close()
             logger.info("Fyers WebSocket disconnected")
+        if self._tick_consumer is not None:
+            self._tick_consumer.cancel()
+            self._tick_consumer = None
     
     async def subscribe(self, instruments: List[int]):
         """Subscribe to instruments."""
         if self.ws:
-            fyers_symbols = [str(i) for i in instruments]
+            # Only send symbols the socket isn't already streaming
+            fyers_symbols = list(
+                set(self._to_symbols(instruments)) - self._subscribed_instruments
+            )
+            if not fyers_symbols:
+                return
             self.ws.subscribe(symbols=fyers_symbols, data_type="SymbolUpdate")
-            self._subscribed_instruments.extend(fyers_symbols)
-            logger.info(f"Subscribed to {len(instruments)} instruments")
+            self._subscribed_instruments.update(fyers_symbols)
+            logger.info(f"Subscribed to {len(fyers_symbols)} instruments")
     
     async def unsubscribe(self, instruments: List[int]):
         """Unsubscribe from instruments."""
         if self.ws:
-            fyers_symbols = [str(i) for i in instruments]
+            fyers_symbols = self._to_symbols(instruments)
             self.ws.unsubscribe(symbols=fyers_symbols)
-            self._subscribed_instruments = [
-                i for i in self._subscribed_instruments if i not in fyers_symbols
-            ]
+            self._subscribed_instruments.difference_update(fyers_symbols)
             logger.info(f"Unsubscribed from {len(instruments)} instruments")
     
     async def fetch_historical(
@@ -153,24 +295,32 @@ class FyersBroker(BrokerInterface):
                 "cont_flag": "1"
             }
             
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
+            response = await asyncio.get_running_loop().run_in_executor(
+                self._io_pool,
                 self.fyers.history,
                 data
             )
             
             if response['s'] == 'ok':
-                candles = []
-                for i in range(len(response['t'])):
-                    candles.append({
-                        'time': datetime.fromtimestamp(response['t'][i]),
-                        'open': response['o'][i],
-                        'high': response['h'][i],
-                        'low': response['l'][i],
-                        'close': response['c'][i],
-                        'volume': response['v'][i],
+                # Convert all epoch seconds in one pass instead of per row
+                times = pd.to_datetime(
+                    np.asarray(response['t'], dtype='i8'), unit='s', utc=True
+                ).to_pydatetime()
+                candles = [
+                    {
+                        'time': t,
+                        'open': o,
+                        'high': h,
+                        'low': lo,
+                        'close': c,
+                        'volume': v,
                         'open_interest': 0  # Fyers doesn't provide OI in history
-                    })
+                    }
+                    for t, o, h, lo, c, v in zip(
+                        times, response['o'], response['h'],
+                        response['l'], response['c'], response['v']
+                    )
+                ]
                 
                 logger.info(f"Fetched {len(candles)} historical candles for {instrument}")
                 return candles
@@ -197,11 +347,11 @@ class FyersBroker(BrokerInterface):
     async def get_quote(self, instruments: List[int]) -> Dict:
         """Get current quote for instruments."""
         try:
-            symbols = ",".join([str(i) for i in instruments])
+            symbols = ",".join(self._to_symbols(instruments))
             data = {"symbols": symbols}
             
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
+            response = await asyncio.get_running_loop().run_in_executor(
+                self._io_pool,
                 self.fyers.quotes,
                 data
             )
@@ -1,32 +1,76 @@
 """Kite Connect broker implementation."""
 
 import asyncio
-from typing import List, Dict, Callable, Optional
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from pathlib import Path
+from typing import List, Dict, Callable, Optional, Set
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
 from loguru import logger
 
-try:
-    from kiteconnect import KiteConnect, KiteTicker
-except ImportError as e:
-    logger.warning(
-        f"KiteConnect import failed: {e}. Install with: pip install kiteconnect"
-    )
-    KiteConnect = None
-    KiteTicker = None
+# Imported on first KiteBroker() by _import_sdk (pulls in requests, Twisted)
+KiteConnect = None
+KiteTicker = None
 
 from app.brokers.base import BrokerInterface
 from app.brokers.auth.kite_auth import KiteAuth
 from app.config import settings
+from app.utils.dates import is_market_open
+
+# Instrument master cache (Kite publishes a new master once per day)
+INSTRUMENTS_CACHE_DIR = Path("/tmp")
+INSTRUMENTS_CACHE_PREFIX = ".kite_instruments_"
+
+
+@dataclass(slots=True)
+class AuthState:
+    """Credentials the broker works with, snapshotted from settings."""
+
+    api_key: str
+    access_token: Optional[str] = None
+    # Token last handed to the KiteConnect client
+    client_token: Optional[str] = None
+
+
+def _import_sdk():
+    """Import kiteconnect on first use so unused brokers cost nothing."""
+    global KiteConnect, KiteTicker
+    if KiteConnect is None:
+        try:
+            from kiteconnect import KiteConnect, KiteTicker
+        except ImportError as e:
+            raise ImportError(
+                "kiteconnect package not installed. Install with: pip install kiteconnect"
+            ) from e
 
 
 class KiteBroker(BrokerInterface):
     """Kite Connect API implementation."""
 
+    __slots__ = (
+        "auth_handler",
+        "kite",
+        "ticker",
+        "callback",
+        "_subscribed_instruments",
+        "_asyncio_loop",
+        "_tick_queue",
+        "_tick_consumer",
+        "dropped_ticks",
+        "_io_pool",
+        "_instruments",
+        "_instruments_day",
+        "_instruments_lock",
+        "_last_tick_ts",
+        "_heartbeat_task",
+        "_auth",
+        "_symbol_cache",
+    )
+
     def __init__(self):
-        if not KiteConnect or not KiteTicker:
-            raise ImportError(
-                "kiteconnect package not installed. Install with: pip install kiteconnect"
-            )
+        _import_sdk()
 
         if not settings.kite_api_key:
             raise ValueError("KITE_API_KEY not configured in environment")
@@ -48,10 +92,40 @@ class KiteBroker(BrokerInterface):
                 "KITE_ACCESS_TOKEN not configured and auto-auth credentials missing"
             )
 
-        self.kite = KiteConnect(api_key=settings.kite_api_key)
+        self._auth = AuthState(
+            api_key=settings.kite_api_key, access_token=settings.kite_access_token
+        )
+        # One keep-alive connection per I/O thread: requests' default pool
+        # of 10 discards (and later re-handshakes) connections beyond that
+        self.kite = KiteConnect(
+            api_key=self._auth.api_key,
+            pool={
+                "pool_connections": 4,
+                "pool_maxsize": settings.broker_io_threads,
+            },
+        )
         self.ticker: Optional[KiteTicker] = None
         self.callback: Optional[Callable] = None
-        self._subscribed_instruments: List[int] = []
+        self._subscribed_instruments: Set[int] = set()
+        self._asyncio_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tick_queue: asyncio.Queue = asyncio.Queue(
+            maxsize=settings.tick_buffer_size
+        )
+        self._tick_consumer: Optional[asyncio.Task] = None
+        self.dropped_ticks = 0
+        # Monotonic time of the last tick batch, watched by the heartbeat
+        self._last_tick_ts = 0.0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # Token -> quote key string, reused across quote calls
+        self._symbol_cache: Dict[int, str] = {}
+        # Dedicated threads for blocking SDK calls, separate from the default executor
+        self._io_pool = ThreadPoolExecutor(
+            max_workers=settings.broker_io_threads, thread_name_prefix="kite-io"
+        )
+        # Today's formatted instrument master, shared by all callers
+        self._instruments: Optional[List[Dict]] = None
+        self._instruments_day: Optional[date] = None
+        self._instruments_lock = asyncio.Lock()
 
         logger.info("Kite broker initialized")
 
@@ -66,16 +140,21 @@ class KiteBroker(BrokerInterface):
 
     async def _ensure_authenticated(self):
         """Ensure we have a valid access token."""
+        auth = self._auth
         if self.auth_handler:
             access_token = await self.auth_handler.get_valid_token()
-            self.kite.set_access_token(access_token)
-            # Update settings for other parts of the app
-            settings.kite_access_token = access_token
-        else:
+            if access_token != auth.access_token:
+                auth.access_token = access_token
+                # Update settings for other parts of the app
+                settings.kite_access_token = access_token
+        elif not auth.access_token:
             # Manual token
-            if not settings.kite_access_token:
-                raise ValueError("No access token available")
-            self.kite.set_access_token(settings.kite_access_token)
+            raise ValueError("No access token available")
+
+        # Only touch the client when the token actually changed
+        if auth.client_token != auth.access_token:
+            self.kite.set_access_token(auth.access_token)
+            auth.client_token = auth.access_token
 
     async def connect_websocket(self, instruments: List[int], callback: Callable):
         """Connect to Kite WebSocket."""
@@ -83,29 +162,50 @@ class KiteBroker(BrokerInterface):
         await self._ensure_authenticated()
 
         self.callback = callback
-        self._subscribed_instruments = instruments
+        self._subscribed_instruments = set(instruments)
 
         # Store the asyncio event loop for use in Twisted callbacks
         self._asyncio_loop = asyncio.get_running_loop()
 
-        self.ticker = KiteTicker(
-            api_key=settings.kite_api_key, access_token=settings.kite_access_token
+        # A repeated connect replaces the socket rather than leaking it
+        if self.ticker:
+            self.ticker.close()
+        self.ticker = self._build_ticker()
+
+        if self._tick_consumer is None or self._tick_consumer.done():
+            self._tick_consumer = asyncio.create_task(self._consume_ticks())
+
+        # Run ticker in background thread
+        await asyncio.get_running_loop().run_in_executor(
+            self._io_pool, self.ticker.connect, True
+        )
+        self._last_tick_ts = time.monotonic()
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        logger.info("Kite WebSocket connection established")
+
+    def _build_ticker(self) -> "KiteTicker":
+        """Create a ticker wired to this broker's callbacks."""
+        ticker = KiteTicker(
+            api_key=self._auth.api_key, access_token=self._auth.access_token
         )
 
         def on_ticks(ws, ticks):
             """Handle incoming ticks."""
             if self.callback and self._asyncio_loop:
-                # Kite ticker uses Twisted, bridge to asyncio using the stored loop
+                # Kite ticker uses Twisted, hand the batch to the asyncio consumer
                 try:
-                    asyncio.run_coroutine_threadsafe(
-                        self._process_ticks(ticks), self._asyncio_loop
+                    self._asyncio_loop.call_soon_threadsafe(
+                        self._enqueue_ticks, ticks
                     )
                 except Exception as e:
-                    logger.error(f"Error scheduling tick processing: {e}")
+                    logger.error("Error scheduling tick processing: {}", e)
 
         def on_connect(ws, response):
             """Handle WebSocket connection."""
             logger.info(f"Kite WebSocket connected: {response}")
+            # Current set, so a replacement ticker resumes every subscription
+            instruments = list(self._subscribed_instruments)
             ws.subscribe(instruments)
             ws.set_mode(ws.MODE_FULL, instruments)
 
@@ -117,68 +217,134 @@ class KiteBroker(BrokerInterface):
             """Handle WebSocket error."""
             logger.error(f"Kite WebSocket error: {code} - {reason}")
 
-        self.ticker.on_ticks = on_ticks
-        self.ticker.on_connect = on_connect
-        self.ticker.on_close = on_close
-        self.ticker.on_error = on_error
-
-        # Run ticker in background thread
-        await asyncio.get_event_loop().run_in_executor(None, self.ticker.connect, True)
-        logger.info("Kite WebSocket connection established")
+        ticker.on_ticks = on_ticks
+        ticker.on_connect = on_connect
+        ticker.on_close = on_close
+        ticker.on_error = on_error
+        return ticker
+
+    async def _heartbeat(self):
+        """
+        Replace the ticker when ticks stop arriving during market hours.
+
+        Intermediaries can leave a dead socket looking open, so silence
+        rather than the SDK's ping decides. Repeated silence after a
+        reconnect (e.g. an exchange holiday) backs off up to 5 minutes.
+        """
+        stale_after = settings.ws_stale_after_seconds
+        while True:
+            await asyncio.sleep(settings.ws_heartbeat_interval_seconds)
+            silence = time.monotonic() - self._last_tick_ts
+            if silence < stale_after:
+                stale_after = settings.ws_stale_after_seconds
+                continue
+            if not is_market_open():
+                continue
+
+            logger.warning(f"No Kite ticks for {silence:.0f}s, reconnecting")
+            try:
+                await self._reconnect()
+            except Exception as e:
+                logger.error(f"Kite WebSocket reconnect failed: {e}")
+            self._last_tick_ts = time.monotonic()
+            stale_after = min(stale_after * 2, 300)
+
+    async def _reconnect(self):
+        """Connect a fresh ticker, then retire the stale one."""
+        await self._ensure_authenticated()
+        stale = self.ticker
+        self.ticker = self._build_ticker()
+        await asyncio.get_running_loop().run_in_executor(
+            self._io_pool, self.ticker.connect, True
+        )
+        if stale:
+            stale.close()
+        logger.info("Kite WebSocket reconnected")
+
+    def _enqueue_ticks(self, ticks: List[Dict]):
+        """
+        Queue a tick batch for the consumer (runs on the event loop).
+
+        The SDK's socket reads without a size limit, so this bounded queue
+        is the only place ticks are dropped; dropped_ticks counts them.
+        """
+        self._last_tick_ts = time.monotonic()
+        try:
+            self._tick_queue.put_nowait(ticks)
+        except asyncio.QueueFull:
+            # Consumer is behind: drop the oldest batch to stay bounded
+            dropped = self._tick_queue.get_nowait()
+            self._tick_queue.put_nowait(ticks)
+            self.dropped_ticks += len(dropped)
+
+    async def _consume_ticks(self):
+        """Process queued tick batches in arrival order."""
+        while True:
+            ticks = await self._tick_queue.get()
+            try:
+                await self._process_ticks(ticks)
+            except Exception as e:
+                logger.error("Error processing ticks: {}", e)
 
     async def _process_ticks(self, ticks: List[Dict]):
         """Process and forward ticks to callback."""
+        # Hot loop: bind lookups to locals and read depth once per tick
+        callback = self.callback
+        # One timestamp per batch: KiteTicker delivers a batch per frame
+        batch_time = datetime.now(timezone.utc)
         for tick in ticks:
-            tick_data = {
-                "time": datetime.now(),
-                "instrument_token": tick.get("instrument_token"),
-                "ltp": tick.get("last_price"),
-                "volume": tick.get("volume"),
-                "open_interest": tick.get("oi"),
-                "bid_price": (
-                    tick.get("depth", {}).get("buy", [{}])[0].get("price")
-                    if tick.get("depth")
-                    else None
-                ),
-                "ask_price": (
-                    tick.get("depth", {}).get("sell", [{}])[0].get("price")
-                    if tick.get("depth")
-                    else None
-                ),
-                "bid_qty": (
-                    tick.get("depth", {}).get("buy", [{}])[0].get("quantity")
-                    if tick.get("depth")
-                    else None
-                ),
-                "ask_qty": (
-                    tick.get("depth", {}).get("sell", [{}])[0].get("quantity")
-                    if tick.get("depth")
-                    else None
-                ),
-            }
-            await self.callback(tick_data)
+            depth = tick.get("depth")
+            if depth:
+                buy = depth["buy"][0]
+                sell = depth["sell"][0]
+                bid_price, bid_qty = buy["price"], buy["quantity"]
+                ask_price, ask_qty = sell["price"], sell["quantity"]
+            else:
+                bid_price = bid_qty = ask_price = ask_qty = None
+
+            await callback(
+                {
+                    "time": batch_time,
+                    "instrument_token": tick.get("instrument_token"),
+                    "ltp": tick.get("last_price"),
+                    "volume": tick.get("volume"),
+                    "open_interest": tick.get("oi"),
+                    "bid_price": bid_price,
+                    "ask_price": ask_price,
+                    "bid_qty": bid_qty,
+                    "ask_qty": ask_qty,
+                }
+            )
 
     async def disconnect_websocket(self):
         """Disconnect from WebSocket."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
         if self.ticker:
             self.ticker.close()
             logger.info("Kite WebSocket disconnected")
+        if self._tick_consumer is not None:
+            self._tick_consumer.cancel()
+            self._tick_consumer = None
 
     async def subscribe(self, instruments: List[int]):
         """Subscribe to instruments."""
         if self.ticker and self.ticker.is_connected():
-            self.ticker.subscribe(instruments)
-            self.ticker.set_mode(self.ticker.MODE_FULL, instruments)
-            self._subscribed_instruments.extend(instruments)
-            logger.info(f"Subscribed to {len(instruments)} instruments")
+            # Only send tokens the ticker isn't already streaming
+            new_instruments = list(set(instruments) - self._subscribed_instruments)
+            if not new_instruments:
+                return
+            self.ticker.subscribe(new_instruments)
+            self.ticker.set_mode(self.ticker.MODE_FULL, new_instruments)
+            self._subscribed_instruments.update(new_instruments)
+            logger.info(f"Subscribed to {len(new_instruments)} instruments")
 
     async def unsubscribe(self, instruments: List[int]):
         """Unsubscribe from instruments."""
         if self.ticker and self.ticker.is_connected():
             self.ticker.unsubscribe(instruments)
-            self._subscribed_instruments = [
-                i for i in self._subscribed_instruments if i not in instruments
-            ]
+            self._subscribed_instruments.difference_update(instruments)
             logger.info(f"Unsubscribed from {len(instruments)} instruments")
 
     async def fetch_historical_candles(
@@ -203,8 +369,8 @@ class KiteBroker(BrokerInterface):
             }
             kite_interval = interval_map.get(interval, interval)
 
-            data = await asyncio.get_event_loop().run_in_executor(
-                None,
+            data = await asyncio.get_running_loop().run_in_executor(
+                self._io_pool,
                 self.kite.historical_data,
                 instrument_token,
                 from_date.strftime("%Y-%m-%d"),
@@ -213,19 +379,19 @@ class KiteBroker(BrokerInterface):
             )
 
             # Convert to standard format required by candle service
-            candles = []
-            for candle in data:
-                candles.append(
-                    {
-                        "time": candle["date"],  # Timestamp of the candle
-                        "open": candle["open"],
-                        "high": candle["high"],
-                        "low": candle["low"],
-                        "close": candle["close"],
-                        "volume": candle["volume"],
-                        "open_interest": candle.get("oi", 0),
-                    }
-                )
+            # (Kite already returns parsed datetimes, so this is a key rename)
+            candles = [
+                {
+                    "time": candle["date"],  # Timestamp of the candle
+                    "open": candle["open"],
+                    "high": candle["high"],
+                    "low": candle["low"],
+                    "close": candle["close"],
+                    "volume": candle["volume"],
+                    "open_interest": candle.get("oi", 0),
+                }
+                for candle in data
+            ]
 
             logger.info(
                 f"Fetched {len(candles)} historical candles for {instrument_token}"
@@ -233,17 +399,70 @@ class KiteBroker(BrokerInterface):
             return candles
 
         except Exception as e:
+            # Throttled (HTTP 429): raise so the window is retried later
+            # instead of being recorded as having no data
+            if getattr(e, "code", None) == 429:
+                raise
             logger.error(f"Failed to fetch historical data: {e}")
             return []
 
+    def _load_instruments_cache(self, cache_file: Path) -> Optional[List[Dict]]:
+        """Load today's formatted instrument master from disk."""
+        try:
+            if cache_file.exists():
+                return orjson.loads(cache_file.read_bytes())
+        except Exception as e:
+            logger.warning(f"Failed to load instruments cache: {e}")
+        return None
+
+    def _save_instruments_cache(self, cache_file: Path, instruments: List[Dict]):
+        """Save formatted instrument master to disk, dropping older days."""
+        try:
+            for stale in INSTRUMENTS_CACHE_DIR.glob(f"{INSTRUMENTS_CACHE_PREFIX}*.json"):
+                if stale != cache_file:
+                    stale.unlink(missing_ok=True)
+            cache_file.write_bytes(orjson.dumps(instruments))
+            logger.info(f"Instruments cached to {cache_file}")
+        except Exception as e:
+            logger.warning(f"Failed to save instruments cache: {e}")
+
     async def get_instruments(self) -> List[Dict]:
-        """Fetch instrument master from Kite."""
+        """
+        Fetch instrument master from Kite.
+
+        The formatted master is kept in memory for the day; concurrent
+        callers on a miss wait for a single disk load or REST fetch.
+        """
+        today = date.today()
+        if self._instruments_day == today:
+            return self._instruments
+
+        async with self._instruments_lock:
+            if self._instruments_day != today:
+                instruments = await self._load_instruments(today)
+                if not instruments:
+                    # Don't memoize a failed fetch
+                    return instruments
+                self._instruments = instruments
+                self._instruments_day = today
+        return self._instruments
+
+    async def _load_instruments(self, day: date) -> List[Dict]:
+        """Load a day's instrument master from the disk cache or Kite."""
+        cache_file = (
+            INSTRUMENTS_CACHE_DIR / f"{INSTRUMENTS_CACHE_PREFIX}{day.isoformat()}.json"
+        )
+        cached = await asyncio.to_thread(self._load_instruments_cache, cache_file)
+        if cached is not None:
+            logger.info(f"Loaded {len(cached)} instruments from cache")
+            return cached
+
         # Ensure we have a valid token
         await self._ensure_authenticated()
 
         try:
-            instruments = await asyncio.get_event_loop().run_in_executor(
-                None, self.kite.instruments
+            instruments = await asyncio.get_running_loop().run_in_executor(
+                self._io_pool, self.kite.instruments
             )
 
             # Convert to standard format
@@ -268,6 +487,8 @@ class KiteBroker(BrokerInterface):
                 )
 
             logger.info(f"Fetched {len(formatted_instruments)} instruments")
+            if formatted_instruments:
+                self._save_instruments_cache(cache_file, formatted_instruments)
             return formatted_instruments
 
         except Exception as e:
@@ -280,9 +501,16 @@ class KiteBroker(BrokerInterface):
         await self._ensure_authenticated()
 
         try:
-            # Convert tokens to exchange:symbol format if needed
-            quotes = await asyncio.get_event_loop().run_in_executor(
-                None, self.kite.quote, [str(i) for i in instruments]
+            # Kite accepts bare instrument tokens as well as exchange:symbol
+            cache = self._symbol_cache
+            keys = []
+            for token in instruments:
+                key = cache.get(token)
+                if key is None:
+                    key = cache[token] = str(token)
+                keys.append(key)
+            quotes = await asyncio.get_running_loop().run_in_executor(
+                self._io_pool, self.kite.quote, keys
             )
             return quotes
         except Exception as e:
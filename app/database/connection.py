@@ -1,35 +1,73 @@
 """Database connection management."""
+import asyncio
 import asyncpg
-from typing import Optional
+from asyncpg.prepared_stmt import PreparedStatement
+from typing import Dict, Optional
 from loguru import logger
 from app.config import settings
 
 
+class Connection(asyncpg.Connection):
+    """asyncpg connection that keeps its own prepared statements."""
+
+    __slots__ = ("_prepared",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prepared: Dict[str, PreparedStatement] = {}
+
+    async def prepared(self, query: str) -> PreparedStatement:
+        """
+        Get a prepared statement for a query, preparing it on first use.
+
+        Statements live as long as the pooled connection, so hot queries
+        are parsed and planned once per connection instead of per call.
+        """
+        stmt = self._prepared.get(query)
+        if stmt is None:
+            stmt = await self.prepare(query)
+            self._prepared[query] = stmt
+        return stmt
+
+
 class DatabasePool:
     """Database connection pool manager."""
     
-    def __init__(self):
+    def __init__(self, name: str, min_size: int, max_size: int):
         self._pool: Optional[asyncpg.Pool] = None
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
     
     async def connect(self):
         """Create database connection pool."""
         try:
             self._pool = await asyncpg.create_pool(
                 settings.database_url,
-                min_size=5,
-                max_size=20,
-                command_timeout=60
+                min_size=self.min_size,
+                max_size=self.max_size,
+                command_timeout=60,
+                connection_class=Connection,
+                # Ad-hoc queries (per-interval candle tables, dashboard
+                # filters) share asyncpg's implicit cache; keep more of them
+                statement_cache_size=settings.db_statement_cache_size,
+                max_cacheable_statement_size=32 * 1024,
+                server_settings={
+                    # Short OLTP-style queries; JIT compilation only adds latency
+                    "jit": "off",
+                    "application_name": f"visual_market_analyzer:{self.name}",
+                },
             )
-            logger.info("Database pool created successfully")
+            logger.info(f"Database pool '{self.name}' created successfully")
         except Exception as e:
-            logger.error(f"Failed to create database pool: {e}")
+            logger.error(f"Failed to create database pool '{self.name}': {e}")
             raise
     
     async def disconnect(self):
         """Close database connection pool."""
         if self._pool:
             await self._pool.close()
-            logger.info("Database pool closed")
+            logger.info(f"Database pool '{self.name}' closed")
     
     def get_pool(self) -> asyncpg.Pool:
         """Get the connection pool."""
@@ -38,21 +76,43 @@ class DatabasePool:
         return self._pool
 
 
-# Global database pool instance
-db_pool = DatabasePool()
+# Global database pool instances: tick flushes get their own small pool so
+# backfills, aggregate refreshes and API queries can't starve them
+db_pool = DatabasePool(
+    "query", settings.db_query_pool_min_size, settings.db_query_pool_max_size
+)
+ingest_pool = DatabasePool(
+    "ingest", settings.db_ingest_pool_min_size, settings.db_ingest_pool_max_size
+)
+
+# Set once both pools are open, for background tasks started alongside init
+db_ready = asyncio.Event()
 
 
 async def init_db():
-    """Initialize database connection."""
+    """Initialize database connections."""
     await db_pool.connect()
+    await ingest_pool.connect()
+    db_ready.set()
 
 
 async def close_db():
-    """Close database connection."""
+    """Close database connections."""
+    db_ready.clear()
+    await ingest_pool.disconnect()
     await db_pool.disconnect()
 
 
 async def get_db_pool() -> asyncpg.Pool:
-    """Get database connection pool."""
+    """Get database connection pool (the query pool)."""
     return db_pool.get_pool()
 
+
+async def get_query_pool() -> asyncpg.Pool:
+    """Get the pool for candle queries, backfills and API reads."""
+    return db_pool.get_pool()
+
+
+async def get_ingest_pool() -> asyncpg.Pool:
+    """Get the pool reserved for tick ingestion flushes."""
+    return ingest_pool.get_pool()
@@ -0,0 +1,128 @@
+-- Rebuild candles_5m and candles_15m as hierarchical continuous aggregates
+-- (candles_5m on candles_1m, candles_15m on candles_5m), matching schema.sql.
+--
+-- schema.sql only creates views that don't exist yet, so databases created
+-- before this change keep 5m/15m aggregates that scan tick_data. candles_1h
+-- is built on candles_15m and has to be dropped and recreated with it.
+--
+-- The rebuilt aggregates are materialized from candles_1m, which keeps 30
+-- days: older 5m/15m/1h history is lost. Continuous aggregates can't be
+-- created or refreshed inside a transaction, so run this file as-is:
+--
+--     psql "$DATABASE_URL" -f app/database/migrations/001_hierarchical_candle_aggregates.sql
+
+DROP MATERIALIZED VIEW IF EXISTS candles_1h;
+DROP MATERIALIZED VIEW IF EXISTS candles_15m;
+DROP MATERIALIZED VIEW IF EXISTS candles_5m;
+
+-- 5-minute candles (hierarchical continuous aggregate on candles_1m)
+CREATE MATERIALIZED VIEW candles_5m
+WITH (timescaledb.continuous) AS
+SELECT 
+    time_bucket('5 minutes', bucket) AS bucket,
+    instrument_token,
+    FIRST(open, bucket) AS open,
+    MAX(high) AS high,
+    MIN(low) AS low,
+    LAST(close, bucket) AS close,
+    SUM(volume) AS volume,
+    LAST(open_interest, bucket) AS open_interest
+FROM candles_1m
+GROUP BY time_bucket('5 minutes', bucket), instrument_token
+WITH NO DATA;
+
+CREATE INDEX IF NOT EXISTS idx_candles_5m_instrument_bucket 
+    ON candles_5m (instrument_token, bucket DESC);
+
+SELECT add_continuous_aggregate_policy('candles_5m',
+    start_offset => INTERVAL '3 hours',
+    end_offset => INTERVAL '5 minutes',
+    schedule_interval => INTERVAL '5 minutes',
+    if_not_exists => TRUE);
+
+SELECT add_retention_policy('candles_5m', INTERVAL '90 days', if_not_exists => TRUE);
+
+-- 15-minute candles (hierarchical continuous aggregate on candles_5m)
+CREATE MATERIALIZED VIEW candles_15m
+WITH (timescaledb.continuous) AS
+SELECT 
+    time_bucket('15 minutes', bucket) AS bucket,
+    instrument_token,
+    FIRST(open, bucket) AS open,
+    MAX(high) AS high,
+    MIN(low) AS low,
+    LAST(close, bucket) AS close,
+    SUM(volume) AS volume,
+    LAST(open_interest, bucket) AS open_interest
+FROM candles_5m
+GROUP BY time_bucket('15 minutes', bucket), instrument_token
+WITH NO DATA;
+
+CREATE INDEX IF NOT EXISTS idx_candles_15m_instrument_bucket 
+    ON candles_15m (instrument_token, bucket DESC);
+
+SELECT add_continuous_aggregate_policy('candles_15m',
+    start_offset => INTERVAL '6 hours',
+    end_offset => INTERVAL '15 minutes',
+    schedule_interval => INTERVAL '15 minutes',
+    if_not_exists => TRUE);
+
+SELECT add_retention_policy('candles_15m', INTERVAL '6 months', if_not_exists => TRUE);
+
+-- 1-hour candles (unchanged definition, recreated on the new candles_15m)
+CREATE MATERIALIZED VIEW candles_1h
+WITH (timescaledb.continuous) AS
+SELECT 
+    time_bucket('1 hour', bucket) AS bucket,
+    instrument_token,
+    FIRST(open, bucket) AS open,
+    MAX(high) AS high,
+    MIN(low) AS low,
+    LAST(close, bucket) AS close,
+    SUM(volume) AS volume,
+    LAST(open_interest, bucket) AS open_interest
+FROM candles_15m
+GROUP BY time_bucket('1 hour', bucket), instrument_token
+WITH NO DATA;
+
+CREATE INDEX IF NOT EXISTS idx_candles_1h_instrument_bucket 
+    ON candles_1h (instrument_token, bucket DESC);
+
+SELECT add_continuous_aggregate_policy('candles_1h',
+    start_offset => INTERVAL '2 hours',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 hour',
+    if_not_exists => TRUE);
+
+SELECT add_retention_policy('candles_1h', INTERVAL '1 year', if_not_exists => TRUE);
+
+-- Materialize everything candles_1m still holds, bottom up
+CALL refresh_continuous_aggregate('candles_5m', NULL, NULL);
+CALL refresh_continuous_aggregate('candles_15m', NULL, NULL);
+CALL refresh_continuous_aggregate('candles_1h', NULL, NULL);
+
+-- Compression, as in schema.sql
+ALTER MATERIALIZED VIEW candles_5m SET (
+    timescaledb.compress = true,
+    timescaledb.compress_segmentby = 'instrument_token',
+    timescaledb.compress_orderby = 'bucket DESC'
+);
+SELECT add_compression_policy('candles_5m', compress_after => INTERVAL '7 days', if_not_exists => TRUE);
+
+ALTER MATERIALIZED VIEW candles_15m SET (
+    timescaledb.compress = true,
+    timescaledb.compress_segmentby = 'instrument_token',
+    timescaledb.compress_orderby = 'bucket DESC'
+);
+SELECT add_compression_policy('candles_15m', compress_after => INTERVAL '7 days', if_not_exists => TRUE);
+
+ALTER MATERIALIZED VIEW candles_1h SET (
+    timescaledb.compress = true,
+    timescaledb.compress_segmentby = 'instrument_token',
+    timescaledb.compress_orderby = 'bucket DESC'
+);
+SELECT add_compression_policy('candles_1h', compress_after => INTERVAL '7 days', if_not_exists => TRUE);
+
+COMMENT ON MATERIALIZED VIEW candles_5m IS '5-minute OHLCV candles. Auto-aggregated from candles_1m. Compressed after 7 days, retained for 90 days.';
+COMMENT ON MATERIALIZED VIEW candles_15m IS '15-minute OHLCV candles. Auto-aggregated from candles_5m. Compressed after 7 days, retained for 6 months.';
+COMMENT ON MATERIALIZED VIEW candles_1h IS '1-hour OHLCV candles. Auto-aggregated from candles_15m. Compressed after 7 days, retained for 1 year.';
@@ -2,10 +2,23 @@
 
 from datetime import datetime, date
 from typing import List, Dict, Optional
+from dataclasses import dataclass
 from decimal import Decimal
+from enum import Enum
+from asyncpg import Record
 from pydantic import BaseModel
 
 
+class Interval(str, Enum):
+    """Supported candle intervals."""
+
+    M1 = "1m"
+    M5 = "5m"
+    M15 = "15m"
+    H1 = "1h"
+    D1 = "1d"
+
+
 class Instrument(BaseModel):
     """Instrument model."""
 
@@ -19,37 +32,141 @@ class Instrument(BaseModel):
     strike: Optional[Decimal] = None
     option_type: Optional[str] = None
     lot_size: Optional[int] = None
+    display_text: Optional[str] = None
+    segment_rank: Optional[int] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
 
-class TickData(BaseModel):
-    """Tick data model."""
+@dataclass(slots=True)
+class TickData:
+    """Tick data record (plain slotted dataclass; no per-field validation)."""
 
     time: datetime
     instrument_token: int
-    ltp: Optional[Decimal] = None
+    ltp: Optional[float] = None
     volume: Optional[int] = None
     open_interest: Optional[int] = None
-    bid_price: Optional[Decimal] = None
-    ask_price: Optional[Decimal] = None
+    bid_price: Optional[float] = None
+    ask_price: Optional[float] = None
     bid_qty: Optional[int] = None
     ask_qty: Optional[int] = None
 
 
-class Candle(BaseModel):
-    """Candle data model."""
+@dataclass(slots=True)
+class Candle:
+    """Candle data record (plain slotted dataclass; no per-field validation)."""
 
     bucket: datetime
     instrument_token: int
-    open: Decimal
-    high: Decimal
-    low: Decimal
-    close: Decimal
+    open: float
+    high: float
+    low: float
+    close: float
     volume: int
     open_interest: Optional[int] = None
 
 
+# Hot single-row queries, prepared once per pooled connection
+_INSTRUMENT_BY_TOKEN_SQL = "SELECT * FROM instruments WHERE token = $1"
+
+# One array per column; the whole batch is upserted in a single statement
+_UPSERT_INSTRUMENTS_SQL = """
+    INSERT INTO instruments 
+    (token, symbol, exchange, segment, instrument_type, expiry, strike, option_type, lot_size,
+     display_text, segment_rank)
+    SELECT * FROM UNNEST(
+        $1::int[], $2::text[], $3::text[], $4::text[], $5::text[], $6::date[],
+        $7::numeric[], $8::text[], $9::int[], $10::text[], $11::int2[]
+    )
+    ON CONFLICT (token) DO UPDATE 
+    SET symbol = EXCLUDED.symbol,
+        exchange = EXCLUDED.exchange,
+        segment = EXCLUDED.segment,
+        instrument_type = EXCLUDED.instrument_type,
+        expiry = EXCLUDED.expiry,
+        strike = EXCLUDED.strike,
+        option_type = EXCLUDED.option_type,
+        lot_size = EXCLUDED.lot_size,
+        display_text = EXCLUDED.display_text,
+        segment_rank = EXCLUDED.segment_rank,
+        updated_at = NOW()
+"""
+
+# Instruments per upsert statement
+INSTRUMENT_UPSERT_CHUNK_SIZE = 10_000
+
+_SEARCH_INSTRUMENTS_SQL = """
+    SELECT * FROM instruments 
+    WHERE symbol ILIKE '%' || $1 || '%' OR exchange ILIKE '%' || $1 || '%'
+    ORDER BY symbol
+    LIMIT $2
+"""
+
+# DECIMAL price columns are cast server-side so rows decode straight to
+# floats instead of Python Decimals (SUM over BIGINT is NUMERIC too)
+_TICK_COLUMNS = """
+    time, instrument_token, ltp::float8 AS ltp, volume, open_interest,
+    bid_price::float8 AS bid_price, ask_price::float8 AS ask_price,
+    bid_qty, ask_qty
+"""
+
+_CANDLE_COLUMNS = """
+    bucket, instrument_token, open::float8 AS open, high::float8 AS high,
+    low::float8 AS low, close::float8 AS close, volume::int8 AS volume,
+    open_interest
+"""
+
+_LATEST_TICK_SQL = f"""
+    SELECT {_TICK_COLUMNS} FROM tick_data 
+    WHERE instrument_token = $1 
+    ORDER BY time DESC 
+    LIMIT 1
+"""
+
+_TICKS_RANGE_SQL = f"""
+    SELECT {_TICK_COLUMNS} FROM tick_data 
+    WHERE instrument_token = $1 
+    AND time >= $2 AND time <= $3
+    ORDER BY time ASC
+"""
+
+# One statement per candle view, so each can be prepared and reused
+_CANDLES_SQL = {
+    interval.value: f"""
+        SELECT {_CANDLE_COLUMNS} FROM candles_{interval.value}
+        WHERE instrument_token = $1 
+        AND bucket >= $2 AND bucket <= $3
+        ORDER BY bucket ASC
+    """
+    for interval in Interval
+}
+
+_SUBSCRIBED_TOKENS_SQL = """
+    SELECT instrument_token FROM subscribed_instruments 
+    WHERE is_active = TRUE
+"""
+
+# Aggregate name and window are bound parameters, so one statement serves
+# every view and windows go over the wire as binary timestamps
+_REFRESH_AGGREGATE_SQL = """
+    CALL refresh_continuous_aggregate($1::regclass, $2::timestamptz, $3::timestamptz)
+"""
+
+_SUBSCRIBE_MANY_SQL = """
+    INSERT INTO subscribed_instruments (instrument_token, is_active)
+    SELECT token, TRUE FROM UNNEST($1::int[]) AS token
+    ON CONFLICT (instrument_token) 
+    DO UPDATE SET is_active = TRUE, subscribed_at = NOW()
+"""
+
+_UNSUBSCRIBE_MANY_SQL = """
+    UPDATE subscribed_instruments 
+    SET is_active = FALSE 
+    WHERE instrument_token = ANY($1::int[])
+"""
+
+
 class InstrumentQueries:
     """Database queries for instruments."""
 
@@ -60,8 +177,9 @@ class InstrumentQueries:
             result = await conn.fetchval(
                 """
                 INSERT INTO instruments 
-                (token, symbol, exchange, segment, instrument_type, expiry, strike, option_type, lot_size)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                (token, symbol, exchange, segment, instrument_type, expiry, strike, option_type, lot_size,
+                 display_text, segment_rank)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
                 ON CONFLICT (token) DO UPDATE 
                 SET symbol = EXCLUDED.symbol,
                     exchange = EXCLUDED.exchange,
@@ -71,6 +189,8 @@ class InstrumentQueries:
                     strike = EXCLUDED.strike,
                     option_type = EXCLUDED.option_type,
                     lot_size = EXCLUDED.lot_size,
+                    display_text = EXCLUDED.display_text,
+                    segment_rank = EXCLUDED.segment_rank,
                     updated_at = NOW()
                 RETURNING id
             """,
@@ -83,138 +203,146 @@ class InstrumentQueries:
                 instrument.strike,
                 instrument.option_type,
                 instrument.lot_size,
+                instrument.display_text,
+                instrument.segment_rank,
             )
             return result
 
+    @staticmethod
+    async def bulk_upsert_instruments(pool, instruments: List[Instrument]) -> int:
+        """
+        Insert or update instruments with one UNNEST upsert per chunk.
+
+        Later duplicates of a token win, as they would with row-by-row
+        upserts (a single statement can't update the same row twice).
+
+        Returns:
+            Number of distinct instruments written
+        """
+        by_token = {instrument.token: instrument for instrument in instruments}
+        rows = list(by_token.values())
+
+        async with pool.acquire() as conn:
+            stmt = await conn.prepared(_UPSERT_INSTRUMENTS_SQL)
+            for i in range(0, len(rows), INSTRUMENT_UPSERT_CHUNK_SIZE):
+                chunk = rows[i : i + INSTRUMENT_UPSERT_CHUNK_SIZE]
+                await stmt.fetch(
+                    [inst.token for inst in chunk],
+                    [inst.symbol for inst in chunk],
+                    [inst.exchange for inst in chunk],
+                    [inst.segment for inst in chunk],
+                    [inst.instrument_type for inst in chunk],
+                    [inst.expiry for inst in chunk],
+                    [inst.strike for inst in chunk],
+                    [inst.option_type for inst in chunk],
+                    [inst.lot_size for inst in chunk],
+                    [inst.display_text for inst in chunk],
+                    [inst.segment_rank for inst in chunk],
+                )
+        return len(rows)
+
     @staticmethod
     async def get_instrument_by_token(pool, token: int) -> Optional[Dict]:
         """Get instrument by token."""
         async with pool.acquire() as conn:
-            result = await conn.fetchrow(
-                """
-                SELECT * FROM instruments WHERE token = $1
-            """,
-                token,
-            )
+            stmt = await conn.prepared(_INSTRUMENT_BY_TOKEN_SQL)
+            result = await stmt.fetchrow(token)
             return dict(result) if result else None
 
     @staticmethod
     async def get_all_instruments(
         pool, limit: int = 1000, offset: int = 0
-    ) -> List[Dict]:
-        """Get all instruments."""
+    ) -> List[Record]:
+        """Get all instruments (the columns served by the listing API)."""
         async with pool.acquire() as conn:
-            results = await conn.fetch(
+            return await conn.fetch(
                 """
-                SELECT * FROM instruments 
+                SELECT id, token, symbol, exchange, segment, instrument_type, lot_size
+                FROM instruments 
                 ORDER BY symbol
                 LIMIT $1 OFFSET $2
             """,
                 limit,
                 offset,
             )
-            return [dict(row) for row in results]
 
     @staticmethod
-    async def search_instruments(pool, query: str, limit: int = 50) -> List[Dict]:
-        """Search instruments by symbol."""
+    async def search_instruments(pool, query: str, limit: int = 50) -> List[Record]:
+        """Search instruments by symbol or exchange substring (trigram-indexed)."""
         async with pool.acquire() as conn:
-            results = await conn.fetch(
-                """
-                SELECT * FROM instruments 
-                WHERE symbol ILIKE $1 OR exchange ILIKE $1
-                ORDER BY symbol
-                LIMIT $2
-            """,
-                f"%{query}%",
-                limit,
-            )
-            return [dict(row) for row in results]
+            stmt = await conn.prepared(_SEARCH_INSTRUMENTS_SQL)
+            return await stmt.fetch(query, limit)
 
 
 class TickDataQueries:
     """Database queries for tick data."""
 
+    COLUMNS = [
+        "time",
+        "instrument_token",
+        "ltp",
+        "volume",
+        "open_interest",
+        "bid_price",
+        "ask_price",
+        "bid_qty",
+        "ask_qty",
+    ]
+
+    @staticmethod
+    async def bulk_insert_ticks_conn(conn, ticks: List[tuple]):
+        """
+        Bulk insert tick data with binary COPY on an acquired connection.
+
+        tick_data has no unique key, so there are no conflicts to skip and
+        COPY stores exactly what an INSERT ... ON CONFLICT DO NOTHING would.
+
+        Args:
+            ticks: Tuples in COLUMNS order
+        """
+        await conn.copy_records_to_table(
+            "tick_data", records=ticks, columns=TickDataQueries.COLUMNS
+        )
+
     @staticmethod
     async def bulk_insert_ticks(pool, ticks: List[tuple]):
-        """Bulk insert tick data."""
+        """
+        Bulk insert tick data with binary COPY.
+
+        Args:
+            ticks: Tuples in COLUMNS order
+        """
         async with pool.acquire() as conn:
-            await conn.executemany(
-                """
-                INSERT INTO tick_data 
-                (time, instrument_token, ltp, volume, open_interest, 
-                 bid_price, ask_price, bid_qty, ask_qty)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-            """,
-                ticks,
-            )
+            await TickDataQueries.bulk_insert_ticks_conn(conn, ticks)
 
     @staticmethod
     async def get_latest_tick(pool, instrument_token: int) -> Optional[Dict]:
         """Get latest tick for instrument."""
         async with pool.acquire() as conn:
-            result = await conn.fetchrow(
-                """
-                SELECT * FROM tick_data 
-                WHERE instrument_token = $1 
-                ORDER BY time DESC 
-                LIMIT 1
-            """,
-                instrument_token,
-            )
+            stmt = await conn.prepared(_LATEST_TICK_SQL)
+            result = await stmt.fetchrow(instrument_token)
             return dict(result) if result else None
 
     @staticmethod
     async def get_ticks_range(
         pool, instrument_token: int, start_time: datetime, end_time: datetime
-    ) -> List[Dict]:
+    ) -> List[Record]:
         """Get ticks for instrument in time range."""
         async with pool.acquire() as conn:
-            results = await conn.fetch(
-                """
-                SELECT * FROM tick_data 
-                WHERE instrument_token = $1 
-                AND time >= $2 AND time <= $3
-                ORDER BY time ASC
-            """,
-                instrument_token,
-                start_time,
-                end_time,
-            )
-            return [dict(row) for row in results]
+            stmt = await conn.prepared(_TICKS_RANGE_SQL)
+            return await stmt.fetch(instrument_token, start_time, end_time)
 
 
 class CandleQueries:
     """Database queries for candle data."""
 
     @staticmethod
-    async def refresh_continuous_aggregates(
-        pool, start_time: datetime, end_time: datetime
+    async def refresh_aggregate_conn(
+        conn, view: str, start_time: datetime, end_time: datetime
     ):
-        """Manually refresh continuous aggregates for a time range."""
-        async with pool.acquire() as conn:
-            # Refresh all continuous aggregates
-            await conn.execute(
-                """
-                CALL refresh_continuous_aggregate('candles_1m', $1, $2);
-            """,
-                start_time,
-                end_time,
-            )
-            await conn.execute(
-                """
-                CALL refresh_continuous_aggregate('candles_5m', $1, $2);
-            """,
-                start_time,
-                end_time,
-            )
-            await conn.execute(
-                """
-                CALL refresh_continuous_aggregate('candles_15m', $1, $2);
-            """,
-                start_time,
-                end_time,
-            )
+        """Refresh one continuous aggregate on an acquired connection."""
+        stmt = await conn.prepared(_REFRESH_AGGREGATE_SQL)
+        await stmt.fetch(view, start_time, end_time)
 
     @staticmethod
     async def get_candles(
@@ -223,62 +351,64 @@ class CandleQueries:
         interval: str,
         start_time: datetime,
         end_time: datetime,
-    ) -> List[Dict]:
+    ) -> List[Record]:
         """Get candles for instrument."""
-        table_name = f"candles_{interval}"
         async with pool.acquire() as conn:
-            results = await conn.fetch(
-                f"""
-                SELECT * FROM {table_name}
-                WHERE instrument_token = $1 
-                AND bucket >= $2 AND bucket <= $3
-                ORDER BY bucket ASC
-            """,
-                instrument_token,
-                start_time,
-                end_time,
-            )
-            return [dict(row) for row in results]
+            stmt = await conn.prepared(_CANDLES_SQL[interval])
+            return await stmt.fetch(instrument_token, start_time, end_time)
 
 
 class SubscriptionQueries:
     """Database queries for subscriptions."""
 
+    @staticmethod
+    async def subscribe_many_conn(conn, tokens: List[int]):
+        """Subscribe to instruments in one statement on an acquired connection."""
+        stmt = await conn.prepared(_SUBSCRIBE_MANY_SQL)
+        await stmt.fetch(tokens)
+
+    @staticmethod
+    async def subscribe_many(pool, tokens: List[int]):
+        """Subscribe to multiple instruments in a single statement."""
+        async with pool.acquire() as conn:
+            await SubscriptionQueries.subscribe_many_conn(conn, tokens)
+
+    @staticmethod
+    async def unsubscribe_many_conn(conn, tokens: List[int]):
+        """Unsubscribe from instruments in one statement on an acquired connection."""
+        stmt = await conn.prepared(_UNSUBSCRIBE_MANY_SQL)
+        await stmt.fetch(tokens)
+
+    @staticmethod
+    async def unsubscribe_many(pool, tokens: List[int]):
+        """Unsubscribe from multiple instruments in a single statement."""
+        async with pool.acquire() as conn:
+            await SubscriptionQueries.unsubscribe_many_conn(conn, tokens)
+
+    @staticmethod
+    async def subscribe_instrument_conn(conn, token: int):
+        """Subscribe to instrument using an already-acquired connection."""
+        await SubscriptionQueries.subscribe_many_conn(conn, [token])
+
     @staticmethod
     async def subscribe_instrument(pool, token: int):
         """Subscribe to instrument."""
-        async with pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO subscribed_instruments (instrument_token, is_active)
-                VALUES ($1, TRUE)
-                ON CONFLICT (instrument_token) 
-                DO UPDATE SET is_active = TRUE, subscribed_at = NOW()
-            """,
-                token,
-            )
+        await SubscriptionQueries.subscribe_many(pool, [token])
+
+    @staticmethod
+    async def unsubscribe_instrument_conn(conn, token: int):
+        """Unsubscribe from instrument using an already-acquired connection."""
+        await SubscriptionQueries.unsubscribe_many_conn(conn, [token])
 
     @staticmethod
     async def unsubscribe_instrument(pool, token: int):
         """Unsubscribe from instrument."""
-        async with pool.acquire() as conn:
-            await conn.execute(
-                """
-                UPDATE subscribed_instruments 
-                SET is_active = FALSE 
-                WHERE instrument_token = $1
-            """,
-                token,
-            )
+        await SubscriptionQueries.unsubscribe_many(pool, [token])
 
     @staticmethod
     async def get_subscribed_instruments(pool) -> List[int]:
         """Get all subscribed instrument tokens."""
         async with pool.acquire() as conn:
-            results = await conn.fetch(
-                """
-                SELECT instrument_token FROM subscribed_instruments 
-                WHERE is_active = TRUE
-            """
-            )
+            stmt = await conn.prepared(_SUBSCRIBED_TOKENS_SQL)
+            results = await stmt.fetch()
             return [row["instrument_token"] for row in results]
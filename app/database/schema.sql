@@ -1,6 +1,9 @@
 -- Enable TimescaleDB extension
 CREATE EXTENSION IF NOT EXISTS timescaledb;
 
+-- Trigram matching for substring instrument search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Instruments master table
 CREATE TABLE IF NOT EXISTS instruments (
     id SERIAL PRIMARY KEY,
@@ -13,14 +16,44 @@ CREATE TABLE IF NOT EXISTS instruments (
     strike DECIMAL(10,2),
     option_type CHAR(2),            -- CE, PE
     lot_size INTEGER,
+    display_text TEXT,              -- "SYMBOL - SEGMENT (EXCHANGE)" for search results
+    segment_rank SMALLINT,          -- Search ordering: INDICES, NSE, NFO-FUT, BSE, other
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Precomputed search columns (populated at instrument sync time)
+ALTER TABLE instruments ADD COLUMN IF NOT EXISTS display_text TEXT;
+ALTER TABLE instruments ADD COLUMN IF NOT EXISTS segment_rank SMALLINT;
+
+UPDATE instruments
+SET display_text = CONCAT(symbol, ' - ', segment, ' (', exchange, ')'),
+    segment_rank = CASE segment
+        WHEN 'INDICES' THEN 1
+        WHEN 'NSE' THEN 2
+        WHEN 'NFO-FUT' THEN 3
+        WHEN 'BSE' THEN 4
+        ELSE 5
+    END
+WHERE display_text IS NULL OR segment_rank IS NULL;
+
 CREATE INDEX IF NOT EXISTS idx_instruments_token ON instruments(token);
 CREATE INDEX IF NOT EXISTS idx_instruments_symbol ON instruments(symbol);
 CREATE INDEX IF NOT EXISTS idx_instruments_exchange ON instruments(exchange);
 
+-- Covering index for the Grafana instrument search (searchable segments only)
+CREATE INDEX IF NOT EXISTS idx_instruments_search
+    ON instruments (segment_rank, symbol) INCLUDE (display_text, token)
+    WHERE segment_rank < 5;
+
+-- Trigram indexes so symbol/exchange ILIKE '%q%' avoid a sequential scan
+-- (the OR in InstrumentQueries.search_instruments becomes a BitmapOr)
+DROP INDEX IF EXISTS idx_instruments_symbol_trgm;
+CREATE INDEX IF NOT EXISTS idx_instruments_symbol_ilike_trgm
+    ON instruments USING gin (symbol gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_instruments_exchange_ilike_trgm
+    ON instruments USING gin (exchange gin_trgm_ops);
+
 -- Backfill tracking table
 CREATE TABLE IF NOT EXISTS backfill_status (
     instrument_token INTEGER PRIMARY KEY,
@@ -95,20 +128,20 @@ SELECT add_continuous_aggregate_policy('candles_1m',
 -- Retention policy (drop data older than 30 days)
 SELECT add_retention_policy('candles_1m', INTERVAL '30 days', if_not_exists => TRUE);
 
--- 5-minute candles (continuous aggregate)
+-- 5-minute candles (hierarchical continuous aggregate on candles_1m)
 CREATE MATERIALIZED VIEW IF NOT EXISTS candles_5m
 WITH (timescaledb.continuous) AS
 SELECT 
-    time_bucket('5 minutes', time) AS bucket,
+    time_bucket('5 minutes', bucket) AS bucket,
     instrument_token,
-    FIRST(ltp, time) AS open,
-    MAX(ltp) AS high,
-    MIN(ltp) AS low,
-    LAST(ltp, time) AS close,
+    FIRST(open, bucket) AS open,
+    MAX(high) AS high,
+    MIN(low) AS low,
+    LAST(close, bucket) AS close,
     SUM(volume) AS volume,
-    LAST(open_interest, time) AS open_interest
-FROM tick_data
-GROUP BY bucket, instrument_token;
+    LAST(open_interest, bucket) AS open_interest
+FROM candles_1m
+GROUP BY time_bucket('5 minutes', bucket), instrument_token;
 
 -- Index for faster queries
 CREATE INDEX IF NOT EXISTS idx_candles_5m_instrument_bucket 
@@ -123,20 +156,20 @@ SELECT add_continuous_aggregate_policy('candles_5m',
 -- Retention policy (drop data older than 90 days)
 SELECT add_retention_policy('candles_5m', INTERVAL '90 days', if_not_exists => TRUE);
 
--- 15-minute candles (continuous aggregate)
+-- 15-minute candles (hierarchical continuous aggregate on candles_5m)
 CREATE MATERIALIZED VIEW IF NOT EXISTS candles_15m
 WITH (timescaledb.continuous) AS
 SELECT 
-    time_bucket('15 minutes', time) AS bucket,
+    time_bucket('15 minutes', bucket) AS bucket,
     instrument_token,
-    FIRST(ltp, time) AS open,
-    MAX(ltp) AS high,
-    MIN(ltp) AS low,
-    LAST(ltp, time) AS close,
+    FIRST(open, bucket) AS open,
+    MAX(high) AS high,
+    MIN(low) AS low,
+    LAST(close, bucket) AS close,
     SUM(volume) AS volume,
-    LAST(open_interest, time) AS open_interest
-FROM tick_data
-GROUP BY bucket, instrument_token;
+    LAST(open_interest, bucket) AS open_interest
+FROM candles_5m
+GROUP BY time_bucket('15 minutes', bucket), instrument_token;
 
 -- Index for faster queries
 CREATE INDEX IF NOT EXISTS idx_candles_15m_instrument_bucket 
@@ -181,16 +214,49 @@ SELECT add_continuous_aggregate_policy('candles_1h',
 -- Retention policy (drop data older than 1 year)
 SELECT add_retention_policy('candles_1h', INTERVAL '1 year', if_not_exists => TRUE);
 
+-- ============================================
+-- CONTINUOUS AGGREGATE COMPRESSION
+-- ============================================
+-- Segment by instrument so per-instrument range scans only decompress
+-- that instrument's batches; compress once past the refresh windows.
+ALTER MATERIALIZED VIEW candles_1m SET (
+    timescaledb.compress = true,
+    timescaledb.compress_segmentby = 'instrument_token',
+    timescaledb.compress_orderby = 'bucket DESC'
+);
+SELECT add_compression_policy('candles_1m', compress_after => INTERVAL '7 days', if_not_exists => TRUE);
+
+ALTER MATERIALIZED VIEW candles_5m SET (
+    timescaledb.compress = true,
+    timescaledb.compress_segmentby = 'instrument_token',
+    timescaledb.compress_orderby = 'bucket DESC'
+);
+SELECT add_compression_policy('candles_5m', compress_after => INTERVAL '7 days', if_not_exists => TRUE);
+
+ALTER MATERIALIZED VIEW candles_15m SET (
+    timescaledb.compress = true,
+    timescaledb.compress_segmentby = 'instrument_token',
+    timescaledb.compress_orderby = 'bucket DESC'
+);
+SELECT add_compression_policy('candles_15m', compress_after => INTERVAL '7 days', if_not_exists => TRUE);
+
+ALTER MATERIALIZED VIEW candles_1h SET (
+    timescaledb.compress = true,
+    timescaledb.compress_segmentby = 'instrument_token',
+    timescaledb.compress_orderby = 'bucket DESC'
+);
+SELECT add_compression_policy('candles_1h', compress_after => INTERVAL '7 days', if_not_exists => TRUE);
+
 -- NOTE: 1-day candles removed - only 1m, 5m, 15m, 1h supported for intraday trading
 
 -- ============================================
 -- COMMENTS
 -- ============================================
 COMMENT ON TABLE tick_data IS 'Raw tick-by-tick data from broker WebSocket. Compressed after 1 day, deleted after 7 days.';
-COMMENT ON MATERIALIZED VIEW candles_1m IS '1-minute OHLCV candles. Auto-aggregated from tick_data. Retained for 30 days.';
-COMMENT ON MATERIALIZED VIEW candles_5m IS '5-minute OHLCV candles. Auto-aggregated from candles_1m. Retained for 90 days.';
-COMMENT ON MATERIALIZED VIEW candles_15m IS '15-minute OHLCV candles. Auto-aggregated from candles_5m. Retained for 6 months.';
-COMMENT ON MATERIALIZED VIEW candles_1h IS '1-hour OHLCV candles. Auto-aggregated from candles_15m. Retained for 1 year.';
+COMMENT ON MATERIALIZED VIEW candles_1m IS '1-minute OHLCV candles. Auto-aggregated from tick_data. Compressed after 7 days, retained for 30 days.';
+COMMENT ON MATERIALIZED VIEW candles_5m IS '5-minute OHLCV candles. Auto-aggregated from candles_1m. Compressed after 7 days, retained for 90 days.';
+COMMENT ON MATERIALIZED VIEW candles_15m IS '15-minute OHLCV candles. Auto-aggregated from candles_5m. Compressed after 7 days, retained for 6 months.';
+COMMENT ON MATERIALIZED VIEW candles_1h IS '1-hour OHLCV candles. Auto-aggregated from candles_15m. Compressed after 7 days, retained for 1 year.';
 
 -- Subscribed instruments (tracking which instruments to stream)
 CREATE TABLE IF NOT EXISTS subscribed_instruments (
@@ -1,16 +1,22 @@
 """FastAPI main application entry point."""
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from loguru import logger
 
 from app.api import instruments, historical, websocket, candles, search, backfill
 from app.database.connection import init_db, close_db
+from app.brokers.auth import close_http_client
 from app.utils.logger import setup_logger
 from app.services.data_ingestion import data_ingestion_service
 from app.services.auto_backfill import start_auto_backfill
+from app.services.aggregate_refresh import aggregate_refresher
 from app.services.realtime_streaming import realtime_service
 from app.services.instruments import InstrumentService
+from app.services.subscriptions import SubscriptionService
+from app.utils.redis_client import redis_client
 
 
 @asynccontextmanager
@@ -19,11 +25,9 @@ async def lifespan(app: FastAPI):
     # Startup
     setup_logger()
     await init_db()
+    await redis_client.connect()
 
     # Sync instruments from broker (on first startup or if empty)
-    import asyncio
-    from loguru import logger
-
     try:
         logger.info("📥 syncing instruments from broker...")
         synced = await InstrumentService.sync_instruments_from_broker()
@@ -31,12 +35,18 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to sync instruments: {e}")
 
+    # Redis may hold a set from a previous run; reload it from Postgres
+    try:
+        await SubscriptionService.warm_cache()
+    except Exception as e:
+        logger.error(f"Failed to warm subscription cache: {e}")
+
     # Start background tasks
     flush_task = asyncio.create_task(data_ingestion_service.start_flush_loop())
+    aggregate_refresher.start()
     await start_auto_backfill()
 
-    # Start real-time streaming (after backfill service initializes)
-    await asyncio.sleep(10)  # Give backfill time to populate backfill_status
+    # Start real-time streaming (waits for the first backfill round)
     await realtime_service.start_auto_streaming()
 
     yield
@@ -45,6 +55,9 @@ async def lifespan(app: FastAPI):
     flush_task.cancel()
     await data_ingestion_service.flush_buffer()
     await realtime_service.stop_streaming()
+    await aggregate_refresher.stop()
+    await close_http_client()
+    await redis_client.disconnect()
     await close_db()
 
 
@@ -81,5 +94,17 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Health check endpoint (includes tick ingestion backpressure)."""
+    return {
+        "status": "healthy",
+        "ingestion": {
+            "buffered_ticks": len(data_ingestion_service.buffer),
+            "retry_ticks": len(data_ingestion_service._retry),
+            "dropped_ticks": data_ingestion_service.dropped_ticks,
+        },
+        "streaming": {
+            "running": realtime_service.is_running,
+            # Ticks dropped between the broker socket and ingestion
+            "dropped_ticks": getattr(realtime_service.broker, "dropped_ticks", 0),
+        },
+    }
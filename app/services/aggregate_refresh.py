@@ -0,0 +1,162 @@
+"""Continuous aggregate refreshes, immediate or coalesced across backfills."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Tuple
+
+import asyncpg
+from loguru import logger
+
+from app.config import settings
+from app.database.connection import get_query_pool
+from app.database.models import CandleQueries
+
+# Refresh order: each aggregate is built on the one before it, so only
+# candles_1m reads tick_data
+AGGREGATES = ("candles_1m", "candles_5m", "candles_15m", "candles_1h")
+# Largest bucket among AGGREGATES; refresh windows are cut on it
+_HOUR = timedelta(hours=1)
+
+
+def _refresh_windows(
+    start_time: datetime, end_time: datetime
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Split a refresh window into consecutive pieces of about one chunk each.
+
+    refresh_continuous_aggregate only materializes buckets that lie wholly
+    inside its window, so the window is widened to whole UTC hours (the
+    largest bucket) and every cut falls on an hour; no bucket straddles
+    two pieces or an edge. The last piece absorbs the remainder (so it's
+    between one and two chunks long) rather than being a sliver.
+    """
+    chunk = timedelta(hours=settings.aggregate_refresh_chunk_hours)
+    start_time = start_time.astimezone(timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+    end_hour = end_time.astimezone(timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+    end_time = end_hour if end_hour == end_time else end_hour + _HOUR
+
+    windows = []
+    current = start_time
+    while end_time - current >= 2 * chunk:
+        windows.append((current, current + chunk))
+        current += chunk
+    windows.append((current, end_time))
+    return windows
+
+
+async def refresh_aggregates(conn, start_time: datetime, end_time: datetime):
+    """
+    Refresh every candle aggregate over a window, 1m → 5m → 15m → 1h.
+
+    Long windows are refreshed a chunk at a time, each its own CALL (and
+    so its own transaction), so a multi-day backfill doesn't materialize
+    everything in one pass.
+    """
+    windows = _refresh_windows(start_time, end_time)
+    refreshed = []
+    for aggregate in AGGREGATES:
+        for window_start, window_end in windows:
+            try:
+                await CandleQueries.refresh_aggregate_conn(
+                    conn, aggregate, window_start, window_end
+                )
+                if aggregate not in refreshed:
+                    refreshed.append(aggregate)
+            except asyncpg.exceptions.InvalidParameterValueError as e:
+                if "refresh window too small" in str(e):
+                    # Time range too small for this aggregate bucket size,
+                    # skip it; the scheduled refresh policy will pick it up
+                    logger.debug(
+                        f"Skipping {aggregate} refresh (window too small for bucket size)"
+                    )
+                else:
+                    raise
+
+    if refreshed:
+        logger.info(
+            f"Refreshed aggregates ({', '.join(refreshed)}) for {start_time} to {end_time}"
+        )
+    else:
+        logger.debug(
+            "No aggregates refreshed (windows too small), data stored in tick_data"
+        )
+
+
+class AggregateRefresher:
+    """
+    Coalesce refresh requests from many backfills into one refresh per window.
+
+    Background backfills submit the window they wrote; every
+    aggregate_refresh_interval_seconds the pending windows are merged into
+    their union and each aggregate is refreshed once over it. A window's
+    optional callback runs once the refresh covering it has finished; a
+    failed refresh leaves its windows queued for the next attempt.
+    """
+
+    def __init__(self):
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        on_refreshed: Optional[Callable[[], None]] = None,
+    ):
+        """Queue a written window for the next coalesced refresh."""
+        self._pending.put_nowait((start_time, end_time, on_refreshed))
+
+    def start(self):
+        """Start the periodic refresh loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the loop, refreshing anything still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        """Refresh the union of all pending windows now."""
+        windows: List[Tuple[datetime, datetime, Optional[Callable[[], None]]]] = []
+        while not self._pending.empty():
+            windows.append(self._pending.get_nowait())
+        if not windows:
+            return
+
+        start_time = min(start for start, _, _ in windows)
+        end_time = max(end for _, end, _ in windows)
+        logger.info(f"Coalesced {len(windows)} aggregate refresh request(s)")
+
+        try:
+            pool = await get_query_pool()
+            async with pool.acquire() as conn:
+                await refresh_aggregates(conn, start_time, end_time)
+        except BaseException:
+            # Keep the windows (and their callbacks) for the next flush;
+            # the refresh policies never look back far enough to cover them
+            for window in windows:
+                self._pending.put_nowait(window)
+            raise
+
+        for _, _, on_refreshed in windows:
+            if on_refreshed is not None:
+                on_refreshed()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.aggregate_refresh_interval_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Coalesced aggregate refresh failed: {e}")
+
+
+# Global refresher instance
+aggregate_refresher = AggregateRefresher()
@@ -6,101 +6,101 @@ from datetime import datetime, timedelta, timezone
 from typing import Set
 from loguru import logger
 
-from app.brokers import get_broker
-from app.services.candle_service import CandleService
-from app.database.connection import get_db_pool
+from app.services.candle_service import get_candle_service
+from app.database.connection import db_ready, get_query_pool
+from app.config import settings
+from app.utils.redis_client import redis_client
 
 # Track recently accessed instruments
 recent_instruments: Set[int] = set()
 last_backfill: dict = {}
 
+# Streamable tokens (instruments with backfilled candles), cached in Redis
+# for the streaming service and cleared when backfills or syncs change them
+STREAM_TOKENS_KEY = "stream:tokens:v1"
+STREAM_TOKENS_TTL = 3600
+
+# Set after the first instrument is backfilled (or once nothing is due), when
+# backfill_status can tell streaming which instruments have data
+backfill_seeded = asyncio.Event()
+
+
+async def invalidate_stream_tokens():
+    """Drop the cached streamable token list."""
+    try:
+        await redis_client.delete(STREAM_TOKENS_KEY)
+    except Exception as e:
+        logger.warning(f"Redis stream token invalidation failed: {e}")
+
 
 def track_instrument(instrument_token: int):
     """Track an instrument for auto-backfill."""
+    if instrument_token in recent_instruments:
+        return
     recent_instruments.add(instrument_token)
     logger.debug(f"Tracking instrument {instrument_token} for auto-backfill")
 
 
-async def get_all_tradable_instruments() -> list:
-    """Get ALL tradable instruments from database."""
-    pool = await get_db_pool()
-    async with pool.acquire() as conn:
-        rows = await conn.fetch(
-            """
-            SELECT token, segment
-            FROM instruments 
-            WHERE segment IN ('INDICES', 'NSE', 'NFO-FUT')
-                AND symbol NOT LIKE '%-SG'  -- Exclude government securities
-                AND symbol NOT LIKE '%-SM'  -- Exclude special category
-            ORDER BY 
-                CASE segment 
-                    WHEN 'INDICES' THEN 1
-                    WHEN 'NFO-FUT' THEN 2
-                    WHEN 'NSE' THEN 3
-                    ELSE 4
-                END,
-                token
-        """
+_DUE_FOR_BACKFILL_SQL = """
+    SELECT i.token
+    FROM instruments i
+    LEFT JOIN backfill_status bs ON bs.instrument_token = i.token
+    WHERE i.segment IN ('INDICES', 'NSE', 'NFO-FUT')
+        AND i.symbol NOT LIKE '%-SG'  -- Exclude government securities
+        AND i.symbol NOT LIKE '%-SM'  -- Exclude special category
+        AND (
+            bs.instrument_token IS NULL
+            OR bs.last_backfilled_date < NOW() - INTERVAL '6 hours'
+            OR bs.last_backfilled_to < NOW() - INTERVAL '1 hour'
         )
-        return [row["token"] for row in rows]
-
+    ORDER BY 
+        CASE i.segment 
+            WHEN 'INDICES' THEN 1
+            WHEN 'NFO-FUT' THEN 2
+            WHEN 'NSE' THEN 3
+            ELSE 4
+        END,
+        i.token
+"""
+
+_UPDATE_BACKFILL_STATUS_SQL = """
+    INSERT INTO backfill_status 
+        (instrument_token, last_backfilled_date, last_backfilled_from, last_backfilled_to, candle_count, updated_at)
+    VALUES ($1, $2, $3, $4, $5, $6)
+    ON CONFLICT (instrument_token) 
+    DO UPDATE SET
+        last_backfilled_date = $2,
+        last_backfilled_from = $3,
+        last_backfilled_to = $4,
+        candle_count = $5,
+        updated_at = $6
+"""
+
+
+async def get_instruments_needing_backfill() -> list:
+    """
+    Get tradable instruments that are due for a backfill.
 
-async def should_backfill(instrument_token: int) -> bool:
-    """Check if instrument needs backfilling."""
-    pool = await get_db_pool()
+    An instrument is due if it was never backfilled, its last backfill ran
+    more than 6 hours ago, or the data it covered ends more than 1 hour ago.
+    """
+    pool = await get_query_pool()
     async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            """
-            SELECT last_backfilled_date, last_backfilled_to
-            FROM backfill_status
-            WHERE instrument_token = $1
-            """,
-            instrument_token,
-        )
-
-        if not row:
-            return True  # Never backfilled
-
-        last_backfilled = row["last_backfilled_date"]
-        last_to = row["last_backfilled_to"]
-        now = datetime.now(timezone.utc)
-
-        # Backfill if last backfill was > 6 hours ago
-        if (now - last_backfilled) > timedelta(hours=6):
-            return True
-
-        # Also backfill if last_to is not recent (> 1 hour old)
-        if (now - last_to) > timedelta(hours=1):
-            return True
-
-        return False
+        stmt = await conn.prepared(_DUE_FOR_BACKFILL_SQL)
+        rows = await stmt.fetch()
+        return [row["token"] for row in rows]
 
 
 async def update_backfill_status(
     instrument_token: int, from_date: datetime, to_date: datetime, candle_count: int
 ):
     """Update backfill tracking."""
-    pool = await get_db_pool()
+    pool = await get_query_pool()
     async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO backfill_status 
-                (instrument_token, last_backfilled_date, last_backfilled_from, last_backfilled_to, candle_count, updated_at)
-            VALUES ($1, $2, $3, $4, $5, $6)
-            ON CONFLICT (instrument_token) 
-            DO UPDATE SET
-                last_backfilled_date = $2,
-                last_backfilled_from = $3,
-                last_backfilled_to = $4,
-                candle_count = $5,
-                updated_at = $6
-            """,
-            instrument_token,
-            datetime.now(timezone.utc),
-            from_date,
-            to_date,
-            candle_count,
-            datetime.now(timezone.utc),
+        stmt = await conn.prepared(_UPDATE_BACKFILL_STATUS_SQL)
+        now = datetime.now(timezone.utc)
+        await stmt.fetch(
+            instrument_token, now, from_date, to_date, candle_count, now
         )
 
 
@@ -111,95 +111,96 @@ async def auto_backfill_service():
     """
     logger.info("🔄 Auto-backfill service started")
 
-    # Wait for database to be ready
-    await asyncio.sleep(5)
+    await db_ready.wait()
 
-    # Create broker instance ONCE (reuses cached token)
+    # Shared broker-backed service (reuses cached token)
     try:
-        broker = get_broker()
-        service = CandleService(broker)
+        service = get_candle_service()
         logger.info("✓ Broker instance initialized")
     except Exception as e:
         logger.error(f"Failed to initialize broker: {e}")
+        backfill_seeded.set()
         return
 
     while True:
         try:
             # Ensure DB pool is available
-            pool = await get_db_pool()
+            pool = await get_query_pool()
             if not pool or pool._closing:
                 logger.warning("Database pool not ready, waiting...")
                 await asyncio.sleep(60)
                 continue
 
-            # Get ALL tradable instruments from DB
-            instruments_to_check = await get_all_tradable_instruments()
-            if not instruments_to_check:
-                logger.warning("No tradable instruments found in database")
+            # Only instruments whose backfill is due, in one query
+            instruments_to_backfill = await get_instruments_needing_backfill()
+            if not instruments_to_backfill:
+                logger.info("No instruments due for backfill")
+                backfill_seeded.set()
                 await asyncio.sleep(60)
                 continue
 
-            logger.info(f"Found {len(instruments_to_check)} total tradable instruments")
+            logger.info(
+                f"🔍 {len(instruments_to_backfill)} instruments due for backfill"
+            )
 
             now = datetime.now(timezone.utc)
+            # Backfill last 7 days for 1m candles
+            from_date = now - timedelta(days=7)
+            to_date = now
+
+            # Broker calls are paced by the candle service's rate limiter;
+            # a fixed set of workers bounds how many instruments are in
+            # flight, and each picks the next token as soon as it's done
+            queue: asyncio.Queue = asyncio.Queue()
+            for token in instruments_to_backfill:
+                queue.put_nowait(token)
+
+            async def _backfill_one(token: int):
+                logger.info(f"📥 Backfilling {token} for last 7 days")
 
-            logger.info(f"🔍 Checking {len(instruments_to_check)} instruments for gaps")
+                # Fill gaps (stored as ticks); the continuous aggregates
+                # (1m → 5m → 15m → 1h) are refreshed once for the whole
+                # cycle by the coalescing refresher
+                candle_count = await service.fill_gaps(token, from_date, to_date, "1m")
 
-            for token in instruments_to_check:
-                try:
+                # Update DB tracking
+                await update_backfill_status(token, from_date, to_date, candle_count)
+
+                logger.info(f"✅ Backfill complete: {token} ({candle_count} candles)")
+
+            async def _worker():
+                while not queue.empty():
                     # Check if pool is still valid
-                    pool = await get_db_pool()
+                    pool = await get_query_pool()
                     if not pool or pool._closing:
-                        logger.warning("Database pool closing, stopping backfill cycle")
-                        break
-
-                    # Check if backfill is needed (using DB tracking)
-                    needs_backfill = await should_backfill(token)
-                    if not needs_backfill:
-                        logger.debug(f"⏭️  Skipping {token} - recently backfilled")
-                        continue
-
-                    # Backfill last 7 days for 1m candles
-                    from_date = now - timedelta(days=7)
-                    to_date = now
-
-                    logger.info(f"📥 Backfilling {token} for last 7 days")
-
-                    # Get candles - fills gaps, stores as ticks
-                    # Continuous aggregates auto-create: 1m → 5m → 15m → 1h → 1d
-                    candles = await service.get_candles(token, from_date, to_date, "1m")
-
-                    # Update DB tracking
-                    await update_backfill_status(
-                        token, from_date, to_date, len(candles)
-                    )
-
-                    logger.info(
-                        f"✅ Backfill complete: {token} ({len(candles)} candles)"
-                    )
-                    logger.info(
-                        f"   Timeframes available: 1m, 5m, 15m, 1h, 1d (via aggregates)"
-                    )
-
-                    # Rate limit: 2 seconds between instruments
-                    await asyncio.sleep(2)
-
-                except asyncpg.exceptions.InterfaceError as e:
-                    if "pool is closing" in str(e):
-                        logger.warning("Database pool closing, stopping backfill cycle")
-                        break
-                    logger.error(f"❌ Database error for {token}: {e}")
-                except Exception as e:
-                    logger.error(f"❌ Error backfilling {token}: {e}")
-                    import traceback
-
-                    logger.error(traceback.format_exc())
+                        return
+
+                    token = queue.get_nowait()
+                    try:
+                        await _backfill_one(token)
+                    except asyncpg.exceptions.InterfaceError as e:
+                        if "pool is closing" in str(e):
+                            return
+                        logger.error(f"❌ Database error for {token}: {e}")
+                    except Exception as e:
+                        logger.opt(exception=e).error(
+                            f"❌ Error backfilling {token}: {e}"
+                        )
+
+                    # backfill_status has rows with candles to stream from now on
+                    backfill_seeded.set()
+
+            await asyncio.gather(
+                *(_worker() for _ in range(settings.auto_backfill_concurrency))
+            )
+            await invalidate_stream_tokens()
+            if not queue.empty():
+                logger.warning("Database pool closing, stopping backfill cycle")
 
         except Exception as e:
-            logger.error(f"Auto-backfill service error: {e}")
-            import traceback
-
-            logger.error(traceback.format_exc())
+            # Don't hold up streaming of already-backfilled instruments
+            backfill_seeded.set()
+            logger.opt(exception=e).error(f"Auto-backfill service error: {e}")
 
         # Wait before next cycle
         logger.info("💤 Waiting 5 minutes before next backfill cycle")
@@ -1,12 +1,134 @@
 """Smart candle service with automatic gap detection and backfill."""
 
+import asyncio
 import asyncpg
-from typing import List, Dict, Tuple
-from datetime import datetime, timedelta
+import numpy as np
+from functools import partial
+from operator import itemgetter
+from typing import List, Dict, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from cachetools import TTLCache
 from loguru import logger
 
-from app.database.connection import get_db_pool
+from app.database.connection import get_query_pool
+from app.database.models import TickDataQueries
+from app.brokers import get_broker
 from app.brokers.base import BrokerInterface
+from app.config import settings
+from app.services.aggregate_refresh import aggregate_refresher, refresh_aggregates
+from app.services.tick_buffer import TICK_DTYPE, ticks_to_rows
+from app.utils.rate_limit import RateLimiter
+
+# Shared by every backfill (API requests and the auto-backfill cycle) so
+# concurrent instruments can't exceed the broker's historical-data limit
+_historical_rate_limiter = RateLimiter(settings.broker_historical_rps)
+
+# Synthetic ticks per 1m candle: price field and its offset into the minute.
+# Open at :00, high at :20, low at :40, close at :59 preserves OHLC through
+# the tick-based continuous aggregates.
+_CANDLE_TICKS = tuple(
+    (field, np.timedelta64(seconds, "s"))
+    for field, seconds in (("open", 0), ("high", 20), ("low", 40), ("close", 59))
+)
+
+# Candle prices in _CANDLE_TICKS order, then volume, read in one C-level pass
+_candle_values = itemgetter(*(field for field, _ in _CANDLE_TICKS), "volume")
+
+# Continuous aggregate per interval (only 1m, 5m, 15m, 1h exist; others
+# are bucketed from candles_1m)
+_TABLES = {
+    "1m": "candles_1m",
+    "5m": "candles_5m",
+    "15m": "candles_15m",
+    "1h": "candles_1h",
+}
+
+# Bucket width per interval
+_BUCKET_WIDTHS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+# Interval names in broker API format
+_BROKER_INTERVALS = {
+    "1m": "minute",
+    "5m": "5minute",
+    "15m": "15minute",
+    "1h": "60minute",
+    "1d": "day",
+}
+
+# Most days of candles the broker returns per historical request, by
+# interval (Kite's documented limits; Fyers allows at least as many)
+_MAX_DAYS_PER_REQUEST = {
+    "1m": 60,
+    "5m": 100,
+    "15m": 200,
+    "1h": 400,
+    "1d": 2000,
+}
+
+_GAPFILL_SQL = """
+    SELECT 
+        time_bucket_gapfill($4::interval, bucket, $2, $3) AS bucket,
+        FIRST(open, bucket)::float8 AS open,
+        MAX(high)::float8 AS high,
+        MIN(low)::float8 AS low,
+        LAST(close, bucket)::float8 AS close,
+        SUM(volume)::int8 AS volume,
+        LAST(open_interest, bucket) AS open_interest
+    FROM {table}
+    WHERE instrument_token = $1
+      AND bucket >= $2
+      AND bucket <= $3
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+# Gapfill query text per interval, rendered once
+_GAPFILL_QUERIES = {
+    interval: _GAPFILL_SQL.format(table=_TABLES.get(interval, "candles_1m"))
+    for interval in _BUCKET_WIDTHS
+}
+
+# Stored 1m buckets as epoch seconds, for the background backfill's gap
+# check: no gapfill rows, OHLCV columns or datetime decoding
+_STORED_1M_BUCKETS_SQL = """
+    SELECT extract(epoch FROM bucket)::int8
+    FROM candles_1m
+    WHERE instrument_token = $1
+      AND bucket >= $2
+      AND bucket <= $3
+    ORDER BY bucket
+"""
+_MINUTE_SECONDS = 60
+
+# Gapfilled rows keyed by (token, from, to, interval). Windows reaching into
+# the last day are still being written to, so they expire quickly; older
+# complete windows can be served from memory much longer. Entries for a
+# token are dropped once candles stored for it reach the aggregates.
+# Both caches are bounded by their total row count, not their entry count.
+_live_candle_cache: TTLCache = TTLCache(maxsize=100_000, ttl=15, getsizeof=len)
+_historical_candle_cache: TTLCache = TTLCache(
+    maxsize=250_000, ttl=3600, getsizeof=len
+)
+_LIVE_WINDOW = timedelta(days=1)
+
+
+def _cache_candles(cache: TTLCache, key: tuple, rows: List[asyncpg.Record]):
+    """Cache a window's rows unless it alone would exceed the cache size."""
+    if len(rows) <= cache.maxsize:
+        cache[key] = rows
+
+
+def _invalidate_candle_cache(instrument_token: int):
+    """Drop cached candle windows for an instrument."""
+    for cache in (_live_candle_cache, _historical_candle_cache):
+        for key in [key for key in cache.keys() if key[0] == instrument_token]:
+            cache.pop(key, None)
 
 
 class CandleService:
@@ -29,7 +151,7 @@ class CandleService:
         from_date: datetime,
         to_date: datetime,
         interval: str = "1m",
-    ) -> List[Dict]:
+    ) -> List[asyncpg.Record]:
         """
         Get candles with automatic gap filling.
 
@@ -42,140 +164,277 @@ class CandleService:
         Returns:
             List of candles with complete data
         """
-        # Step 1: Query database first
-        db_candles = await self._query_db_candles(
+        # Step 1: Query database; missing buckets come back as empty rows
+        rows = await self._query_db_candles(
             instrument_token, from_date, to_date, interval
         )
 
-        # Step 2: Detect gaps
-        gaps = self._find_gaps(db_candles, from_date, to_date, interval)
+        # Step 2: Collect gaps from the empty rows
+        gaps = self._find_gaps(rows, from_date, to_date)
 
         # Step 3: Backfill gaps from broker if needed
         if gaps:
             logger.info(
                 f"Found {len(gaps)} gap(s) for instrument {instrument_token}, backfilling..."
             )
-            for gap_start, gap_end in gaps:
-                await self._backfill_gap(instrument_token, gap_start, gap_end, interval)
+            await self._backfill_gaps(instrument_token, gaps, interval)
 
             # Re-query after backfill
-            db_candles = await self._query_db_candles(
+            rows = await self._query_db_candles(
                 instrument_token, from_date, to_date, interval
             )
+
+        db_candles = [row for row in rows if row["open"] is not None]
+        if gaps:
             logger.info(f"After backfill: {len(db_candles)} candles available")
 
         return db_candles
 
+    async def fill_gaps(
+        self,
+        instrument_token: int,
+        from_date: datetime,
+        to_date: datetime,
+        interval: str = "1m",
+    ) -> int:
+        """
+        Backfill missing candles without reading them back.
+
+        For background backfills: the aggregate refresh is coalesced with
+        other instruments' by the shared refresher rather than run here, so
+        the candles become queryable after its next flush.
+
+        Returns:
+            Candles already stored plus candles fetched from the broker
+        """
+        if interval == "1m":
+            stored, gaps = await self._find_gaps_1m(
+                instrument_token, from_date, to_date
+            )
+        else:
+            rows = await self._query_db_candles(
+                instrument_token, from_date, to_date, interval
+            )
+            stored = sum(1 for row in rows if row["open"] is not None)
+            gaps = self._find_gaps(rows, from_date, to_date)
+
+        if not gaps:
+            return stored
+
+        logger.info(
+            f"Found {len(gaps)} gap(s) for instrument {instrument_token}, backfilling..."
+        )
+        fetched = await self._backfill_gaps(
+            instrument_token, gaps, interval, defer_refresh=True
+        )
+        return stored + fetched
+
+    async def backfill_many(
+        self,
+        instrument_tokens: List[int],
+        from_date: datetime,
+        to_date: datetime,
+        interval: str = "1m",
+        concurrency: Optional[int] = None,
+    ) -> List[Union[int, BaseException]]:
+        """
+        Backfill several instruments concurrently, refreshing aggregates once.
+
+        Each instrument's refresh is deferred to the shared refresher, which
+        is flushed once at the end over the union of the written windows.
+
+        Returns:
+            Per token (in order), its candle count or the exception it raised
+        """
+        semaphore = asyncio.Semaphore(
+            concurrency or settings.auto_backfill_concurrency
+        )
+
+        async def _one(token: int) -> int:
+            async with semaphore:
+                return await self.fill_gaps(token, from_date, to_date, interval)
+
+        results = await asyncio.gather(
+            *(_one(token) for token in instrument_tokens), return_exceptions=True
+        )
+        # Each instrument's cached windows are dropped by the flush
+        await aggregate_refresher.flush()
+        return results
+
     async def _query_db_candles(
         self,
         instrument_token: int,
         from_date: datetime,
         to_date: datetime,
         interval: str,
-    ) -> List[Dict]:
-        """Query candles from TimescaleDB continuous aggregates."""
-        pool = await get_db_pool()
-
-        # Map interval to table (only 1m, 5m, 15m, 1h supported)
-        table_map = {
-            "1m": "candles_1m",
-            "5m": "candles_5m",
-            "15m": "candles_15m",
-            "1h": "candles_1h",
-        }
-
-        table = table_map.get(interval, "candles_1m")
-
-        query = f"""
-            SELECT 
-                bucket,
-                open,
-                high,
-                low,
-                close,
-                volume,
-                open_interest
-            FROM {table}
-            WHERE instrument_token = $1
-              AND bucket >= $2
-              AND bucket <= $3
-            ORDER BY bucket
+    ) -> List[asyncpg.Record]:
         """
+        Query candles from TimescaleDB continuous aggregates.
+
+        Uses time_bucket_gapfill so every bucket in the window is returned;
+        buckets with no candle have NULL OHLCV values. Results are cached
+        briefly (see _live_candle_cache / _historical_candle_cache).
+        """
+        key = (instrument_token, from_date, to_date, interval)
+        rows = _live_candle_cache.get(key)
+        if rows is None:
+            rows = _historical_candle_cache.get(key)
+        if rows is not None:
+            return rows
+
+        pool = await get_query_pool()
+
+        query = _GAPFILL_QUERIES.get(interval, _GAPFILL_QUERIES["1m"])
+        delta = _BUCKET_WIDTHS.get(interval, _BUCKET_WIDTHS["1m"])
 
         async with pool.acquire() as conn:
-            rows = await conn.fetch(query, instrument_token, from_date, to_date)
-            return [dict(row) for row in rows]
+            stmt = await conn.prepared(query)
+            rows = await stmt.fetch(instrument_token, from_date, to_date, delta)
+
+        if to_date >= datetime.now(timezone.utc) - _LIVE_WINDOW:
+            _cache_candles(_live_candle_cache, key, rows)
+        elif all(row["open"] is not None for row in rows):
+            # Windows with gaps are about to be backfilled; don't pin them
+            _cache_candles(_historical_candle_cache, key, rows)
+        return rows
 
     def _find_gaps(
         self,
-        candles: List[Dict],
+        rows: List[asyncpg.Record],
         from_date: datetime,
         to_date: datetime,
-        interval: str,
     ) -> List[Tuple[datetime, datetime]]:
         """
-        Detect missing time periods in candle data.
+        Collapse runs of empty gapfilled buckets into missing time periods.
 
         Returns:
             List of (gap_start, gap_end) tuples
         """
-        if not candles:
-            # No data at all - entire range is a gap
+        if not rows:
+            # No buckets at all - entire range is a gap
             return [(from_date, to_date)]
 
-        # Map interval to timedelta
-        interval_map = {
-            "1m": timedelta(minutes=1),
-            "5m": timedelta(minutes=5),
-            "15m": timedelta(minutes=15),
-            "1h": timedelta(hours=1),
-            "1d": timedelta(days=1),
-        }
-
-        delta = interval_map.get(interval, timedelta(minutes=1))
-        gaps = []
+        # Run boundaries of the empty-bucket mask: +1 where a run starts,
+        # -1 one past where it ends (padded so edge runs are closed)
+        empty = np.fromiter(
+            (row["open"] is None for row in rows), dtype=np.int8, count=len(rows)
+        )
+        edges = np.diff(empty, prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+
+        last = len(rows) - 1
+        return [
+            (
+                max(rows[start]["bucket"], from_date),
+                to_date if end == last else min(rows[end]["bucket"], to_date),
+            )
+            for start, end in zip(starts.tolist(), ends.tolist())
+        ]
 
-        # Check gap before first candle
-        first_bucket = candles[0]["bucket"]
-        # Ensure first_bucket is timezone-aware for comparison
-        if not first_bucket.tzinfo:
-            from datetime import timezone
+    async def _find_gaps_1m(
+        self, instrument_token: int, from_date: datetime, to_date: datetime
+    ) -> Tuple[int, List[Tuple[datetime, datetime]]]:
+        """
+        Find 1m gaps from stored bucket times alone (the auto-backfill path).
 
-            first_bucket = first_bucket.replace(tzinfo=timezone.utc)
-        if first_bucket > from_date + delta:
-            gaps.append((from_date, first_bucket - delta))
+        Gives the same gaps as _find_gaps over a gapfilled window, without
+        fetching a row per minute or going through the candle cache.
 
-        # Check gaps between candles
-        for i in range(len(candles) - 1):
-            current_bucket = candles[i]["bucket"]
-            next_bucket = candles[i + 1]["bucket"]
-            # Ensure timezone-aware
-            if not current_bucket.tzinfo:
-                from datetime import timezone
+        Returns:
+            (stored candle count, list of (gap_start, gap_end) tuples)
+        """
+        pool = await get_query_pool()
+        async with pool.acquire() as conn:
+            stmt = await conn.prepared(_STORED_1M_BUCKETS_SQL)
+            rows = await stmt.fetch(instrument_token, from_date, to_date)
+
+        step = _MINUTE_SECONDS
+        # First and last buckets time_bucket_gapfill would emit, padded
+        # with one bucket each side so edge gaps show up as jumps too
+        first = int(from_date.timestamp()) // step * step
+        last = -(-int(to_date.timestamp()) // step) * step - step
+        buckets = np.empty(len(rows) + 2, dtype=np.int64)
+        buckets[0] = first - step
+        buckets[1:-1] = [row[0] for row in rows]
+        buckets[-1] = last + step
+
+        jumps = np.flatnonzero(np.diff(buckets) > step)
+        gaps = []
+        for start, end in zip(
+            (buckets[jumps] + step).tolist(), (buckets[jumps + 1] - step).tolist()
+        ):
+            gap_start = datetime.fromtimestamp(start, timezone.utc)
+            gap_end = datetime.fromtimestamp(end, timezone.utc)
+            gaps.append(
+                (
+                    max(gap_start, from_date),
+                    to_date if end == last else min(gap_end, to_date),
+                )
+            )
+        return len(rows), gaps
 
-                current_bucket = current_bucket.replace(tzinfo=timezone.utc)
-            if not next_bucket.tzinfo:
-                from datetime import timezone
+    @staticmethod
+    def _split_by_window(
+        from_date: datetime, to_date: datetime, days: int
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Split a window into chunks of at most ``days`` calendar days.
 
-                next_bucket = next_bucket.replace(tzinfo=timezone.utc)
+        Chunks end on day boundaries so date-granular broker requests for
+        adjacent chunks don't overlap.
+        """
+        chunks = []
+        start = from_date
+        while start <= to_date:
+            next_start = start.replace(
+                hour=0, minute=0, second=0, microsecond=0
+            ) + timedelta(days=days)
+            end = min(next_start - timedelta(microseconds=1), to_date)
+            chunks.append((start, end))
+            start = next_start
+        return chunks
+
+    async def _backfill_gaps(
+        self,
+        instrument_token: int,
+        gaps: List[Tuple[datetime, datetime]],
+        interval: str,
+        defer_refresh: bool = False,
+    ) -> int:
+        """
+        Backfill gaps as chunks of the broker's largest request window.
 
-            expected_next = current_bucket + delta
+        Chunks are fetched concurrently; each fetch waits for a slot from
+        the shared historical-data rate limiter.
 
-            # If there's a gap larger than expected
-            if next_bucket > expected_next:
-                gaps.append((expected_next, next_bucket - delta))
+        Returns:
+            Number of candles fetched from the broker
+        """
+        semaphore = asyncio.Semaphore(settings.backfill_concurrency)
 
-        # Check gap after last candle
-        last_bucket = candles[-1]["bucket"]
-        # Ensure timezone-aware
-        if not last_bucket.tzinfo:
-            from datetime import timezone
+        async def _fetch_chunk(chunk_start: datetime, chunk_end: datetime) -> int:
+            async with semaphore:
+                return await self._backfill_gap(
+                    instrument_token, chunk_start, chunk_end, interval, defer_refresh
+                )
 
-            last_bucket = last_bucket.replace(tzinfo=timezone.utc)
-        if last_bucket < to_date - delta:
-            gaps.append((last_bucket + delta, to_date))
+        max_days = _MAX_DAYS_PER_REQUEST.get(interval, 1)
+        chunks = [
+            chunk
+            for gap_start, gap_end in gaps
+            for chunk in self._split_by_window(gap_start, gap_end, max_days)
+        ]
+        results = await asyncio.gather(
+            *(_fetch_chunk(start, end) for start, end in chunks),
+            return_exceptions=True,
+        )
 
-        return gaps
+        # Surface the first failure once every chunk has finished
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return sum(results)
 
     async def _backfill_gap(
         self,
@@ -183,181 +442,120 @@ class CandleService:
         from_date: datetime,
         to_date: datetime,
         interval: str,
-    ):
-        """Fetch missing candles from broker and store in database."""
+        defer_refresh: bool = False,
+    ) -> int:
+        """Fetch missing candles from broker and store them; returns the count."""
         try:
-            # Map interval to broker API format
-            broker_interval_map = {
-                "1m": "minute",
-                "5m": "5minute",
-                "15m": "15minute",
-                "1h": "60minute",
-                "1d": "day",
-            }
-
-            broker_interval = broker_interval_map.get(interval, "minute")
+            broker_interval = _BROKER_INTERVALS.get(interval, "minute")
 
             logger.info(
                 f"Backfilling {instrument_token} from {from_date} to {to_date} ({interval})"
             )
 
-            # Fetch from broker
+            # Fetch from broker, within its historical-data rate limit
+            await _historical_rate_limiter.acquire()
             broker_candles = await self.broker.fetch_historical_candles(
                 instrument_token, from_date, to_date, broker_interval
             )
 
             if not broker_candles:
                 logger.warning(f"No historical data from broker for {instrument_token}")
-                return
+                return 0
 
             # Store candles
-            await self._store_candles(broker_candles, instrument_token, interval)
+            await self._store_candles(
+                broker_candles, instrument_token, interval, defer_refresh
+            )
 
             logger.info(
                 f"✓ Backfilled {len(broker_candles)} candles for {instrument_token}"
             )
+            return len(broker_candles)
 
         except Exception as e:
             logger.error(f"Error backfilling gap: {e}")
             raise
 
+    @staticmethod
+    def _candles_to_ticks(candles: List[Dict], instrument_token: int) -> List[tuple]:
+        """
+        Expand 1m candles into 4 synthetic ticks each, column by column.
+
+        Volume goes only on the open tick so it isn't double-counted.
+        Broker 1m candles always start on the minute, so the tick offsets
+        are added unconditionally.
+        """
+        n = len(candles)
+        timestamps = np.fromiter(
+            (c["time"].timestamp() for c in candles), dtype=np.float64, count=n
+        )
+        times = np.round(timestamps * 1e6).astype(np.int64).astype("datetime64[us]")
+        values = np.array(
+            list(map(_candle_values, candles)), dtype=np.float64
+        ).reshape(n, len(_CANDLE_TICKS) + 1)
+        # None (no OI reported) becomes NaN, i.e. NULL
+        open_interest = np.array(
+            [c.get("open_interest", 0) for c in candles], dtype=np.float64
+        )
+
+        ticks = np.empty(n * 4, dtype=TICK_DTYPE)
+        ticks["instrument_token"] = instrument_token
+        ticks["volume"] = 0
+        ticks["volume"][0::4] = values[:, -1]
+        for name in ("bid_price", "ask_price", "bid_qty", "ask_qty"):
+            ticks[name] = np.nan
+
+        for i, (_, offset) in enumerate(_CANDLE_TICKS):
+            ticks["time"][i::4] = times + offset
+            ticks["ltp"][i::4] = values[:, i]
+            ticks["open_interest"][i::4] = open_interest
+
+        return ticks_to_rows(ticks)
+
     async def _store_candles(
-        self, candles: List[Dict], instrument_token: int, interval: str
+        self,
+        candles: List[Dict],
+        instrument_token: int,
+        interval: str,
+        defer_refresh: bool = False,
     ):
         """
         Store historical candles in database.
 
         For 1m candles: Store as ticks, let continuous aggregates handle it
         For other intervals: Store directly in the materialized view
+
+        With defer_refresh the aggregate refresh is left to the shared
+        coalescing refresher instead of running before returning.
         """
-        pool = await get_db_pool()
+        pool = await get_query_pool()
 
         if interval == "1m":
             # Store OHLC as multiple ticks to preserve price action
             # This allows continuous aggregates to correctly calculate OHLC
-            async with pool.acquire() as conn:
-                records = []
-                for c in candles:
-                    candle_time = c["time"]
-                    # Store 4 ticks per candle to preserve OHLC:
-                    # 1. Open at start of minute (00 seconds)
-                    records.append(
-                        (
-                            candle_time,
-                            instrument_token,
-                            c["open"],
-                            c["volume"],
-                            c.get("open_interest", 0),
-                            None,
-                            None,
-                            None,
-                            None,
-                        )
-                    )
-                    # 2. High at 20 seconds
-                    records.append(
-                        (
-                            (
-                                candle_time.replace(second=20)
-                                if candle_time.second == 0
-                                else candle_time
-                            ),
-                            instrument_token,
-                            c["high"],
-                            0,  # Don't double-count volume
-                            c.get("open_interest", 0),
-                            None,
-                            None,
-                            None,
-                            None,
-                        )
-                    )
-                    # 3. Low at 40 seconds
-                    records.append(
-                        (
-                            (
-                                candle_time.replace(second=40)
-                                if candle_time.second == 0
-                                else candle_time
-                            ),
-                            instrument_token,
-                            c["low"],
-                            0,  # Don't double-count volume
-                            c.get("open_interest", 0),
-                            None,
-                            None,
-                            None,
-                            None,
-                        )
-                    )
-                    # 4. Close at 59 seconds
-                    records.append(
-                        (
-                            (
-                                candle_time.replace(second=59)
-                                if candle_time.second == 0
-                                else candle_time
-                            ),
-                            instrument_token,
-                            c["close"],
-                            0,  # Don't double-count volume
-                            c.get("open_interest", 0),
-                            None,
-                            None,
-                            None,
-                            None,
-                        )
-                    )
+            token = instrument_token
+            # Built off the event loop so a large backfill doesn't stall ticks
+            records = await asyncio.to_thread(self._candles_to_ticks, candles, token)
 
-                await conn.executemany(
-                    """
-                    INSERT INTO tick_data 
-                    (time, instrument_token, ltp, volume, open_interest, 
-                     bid_price, ask_price, bid_qty, ask_qty)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                    ON CONFLICT DO NOTHING
-                """,
-                    records,
-                )
+            async with pool.acquire() as conn:
+                # One binary COPY instead of an INSERT per synthetic tick
+                await TickDataQueries.bulk_insert_ticks_conn(conn, records)
 
                 # Refresh ALL continuous aggregates for this time range
                 start_time = min(c["time"] for c in candles)
                 end_time = max(c["time"] for c in candles)
 
-                # Refresh all timeframes: 1m → 5m → 15m → 1h
-                refreshed = []
-                for aggregate in [
-                    "candles_1m",
-                    "candles_5m",
-                    "candles_15m",
-                    "candles_1h",
-                ]:
-                    try:
-                        refresh_query = f"""
-                            CALL refresh_continuous_aggregate('{aggregate}', 
-                                '{start_time.isoformat()}'::timestamptz, 
-                                '{end_time.isoformat()}'::timestamptz);
-                        """
-                        await conn.execute(refresh_query)
-                        refreshed.append(aggregate)
-                    except asyncpg.exceptions.InvalidParameterValueError as e:
-                        if "refresh window too small" in str(e):
-                            # Time range too small for this aggregate bucket size, skip it
-                            # The scheduled refresh policy will pick it up later
-                            logger.debug(
-                                f"Skipping {aggregate} refresh (window too small for bucket size)"
-                            )
-                        else:
-                            raise
-
-                if refreshed:
-                    logger.info(
-                        f"Refreshed aggregates ({', '.join(refreshed)}) for {start_time} to {end_time}"
+                # Cached windows are dropped only once the aggregates hold
+                # the new candles, so a read in between can't re-cache
+                # stale rows
+                if defer_refresh:
+                    # Merged with other backfills' windows and refreshed later
+                    aggregate_refresher.submit(
+                        start_time, end_time, partial(_invalidate_candle_cache, token)
                     )
                 else:
-                    logger.debug(
-                        f"No aggregates refreshed (windows too small), data stored in tick_data"
-                    )
+                    await refresh_aggregates(conn, start_time, end_time)
+                    _invalidate_candle_cache(token)
 
         else:
             # For higher timeframes, we can't insert directly into continuous aggregates
@@ -366,3 +564,15 @@ class CandleService:
             logger.warning(
                 f"Cannot directly store {interval} candles. Please backfill at 1m resolution."
             )
+
+
+# Shared service instance (created on first use)
+_candle_service: Optional[CandleService] = None
+
+
+def get_candle_service() -> CandleService:
+    """Get the shared candle service backed by the configured broker."""
+    global _candle_service
+    if _candle_service is None:
+        _candle_service = CandleService(get_broker())
+    return _candle_service
@@ -1,11 +1,11 @@
 """Data ingestion service with buffering."""
 import asyncio
-from datetime import datetime
 from typing import List, Dict
 from loguru import logger
 
-from app.database.connection import get_db_pool
+from app.database.connection import get_ingest_pool
 from app.database.models import TickDataQueries
+from app.services.tick_buffer import TickRingBuffer
 from app.config import settings
 
 
@@ -13,10 +13,20 @@ class DataIngestionService:
     """Service for ingesting and buffering tick data."""
     
     def __init__(self):
-        self.buffer: List[tuple] = []
         self.buffer_size = settings.tick_buffer_size
+        # Ticks held in memory (buffered plus awaiting retry) before new ones
+        # are dropped, e.g. while the database is unreachable
+        self.max_pending = self.buffer_size * 4
+        # Double buffer: ticks land in `buffer` while a flush drains the other
+        self.buffer = TickRingBuffer(self.buffer_size, self.max_pending)
+        self._spare = TickRingBuffer(self.buffer_size, self.max_pending)
+        self.dropped_ticks = 0
+        # Drained rows whose insert failed, retried ahead of newer ticks
+        self._retry: List[tuple] = []
         self.flush_interval = settings.flush_interval_seconds
         self._lock = asyncio.Lock()
+        # Set when the buffer fills so the flush loop doesn't wait out its interval
+        self._flush_needed = asyncio.Event()
         
         logger.info(f"Data ingestion service initialized (buffer_size={self.buffer_size})")
     
@@ -24,28 +34,19 @@ class DataIngestionService:
         """
         Buffer incoming tick data.
         
+        Never waits on the database: a full buffer wakes the flush loop
+        so the broker callback (and client broadcast) isn't blocked.
+        
         Args:
             tick_data: Dictionary containing tick information
         """
-        async with self._lock:
-            # Convert to tuple for bulk insert
-            tick_tuple = (
-                tick_data.get('time', datetime.now()),
-                tick_data.get('instrument_token'),
-                tick_data.get('ltp'),
-                tick_data.get('volume'),
-                tick_data.get('open_interest'),
-                tick_data.get('bid_price'),
-                tick_data.get('ask_price'),
-                tick_data.get('bid_qty'),
-                tick_data.get('ask_qty')
-            )
-            
-            self.buffer.append(tick_tuple)
-            
-            # Auto-flush if buffer is full
-            if len(self.buffer) >= self.buffer_size:
-                await self._flush_buffer_internal()
+        # Written in place into the columnar buffer; counted if it's full
+        if not self.buffer.append(tick_data):
+            self.dropped_ticks += 1
+        
+        # Flush early if buffer is full
+        if len(self.buffer) >= self.buffer_size:
+            self._flush_needed.set()
     
     async def flush_buffer(self):
         """Manually flush buffer (public method)."""
@@ -54,20 +55,32 @@ class DataIngestionService:
     
     async def _flush_buffer_internal(self):
         """Internal flush method (assumes lock is held)."""
-        if not self.buffer:
+        if not self.buffer and not self._retry:
             return
         
+        # Swap buffers so ticks arriving during the drain and insert go to
+        # the other one, then convert the full buffer off the event loop
+        full = self.buffer
+        self.buffer, self._spare = self._spare, full
+        rows = await asyncio.to_thread(full.drain)
+        batch = self._retry + rows
+        self._retry = []
+        
         try:
-            pool = await get_db_pool()
-            await TickDataQueries.bulk_insert_ticks(pool, self.buffer)
-            
-            count = len(self.buffer)
-            self.buffer.clear()
-            logger.debug(f"Flushed {count} ticks to database")
+            pool = await get_ingest_pool()
+            await TickDataQueries.bulk_insert_ticks(pool, batch)
+            logger.debug(f"Flushed {len(batch)} ticks to database")
             
         except Exception as e:
             logger.error(f"Failed to flush buffer: {e}")
-            # Keep buffer for retry
+            # Keep batch (ahead of newer ticks) for retry, bounded so a
+            # database outage can't grow it without limit
+            overflow = len(batch) - self.max_pending
+            if overflow > 0:
+                self.dropped_ticks += overflow
+                batch = batch[overflow:]
+                logger.warning(f"Dropped {overflow} oldest unflushed ticks")
+            self._retry = batch
     
     async def start_flush_loop(self):
         """Periodically flush buffer."""
@@ -75,7 +88,14 @@ class DataIngestionService:
         
         try:
             while True:
-                await asyncio.sleep(self.flush_interval)
+                # Every flush_interval, or as soon as the buffer fills
+                try:
+                    await asyncio.wait_for(
+                        self._flush_needed.wait(), timeout=self.flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._flush_needed.clear()
                 await self.flush_buffer()
         except asyncio.CancelledError:
             logger.info("Flush loop cancelled")
@@ -5,7 +5,8 @@ This service now only handles raw tick data queries.
 """
 
 from datetime import datetime
-from typing import List, Dict
+from typing import List
+from asyncpg import Record
 from loguru import logger
 
 from app.database.connection import get_db_pool
@@ -18,7 +19,7 @@ class HistoricalDataService:
     @staticmethod
     async def get_tick_data(
         instrument_token: int, from_date: datetime, to_date: datetime
-    ) -> List[Dict]:
+    ) -> List[Record]:
         """
         Get raw tick data from database.
 
@@ -28,7 +29,7 @@ class HistoricalDataService:
             to_date: End date
 
         Returns:
-            List of tick dictionaries
+            List of tick rows
         """
         try:
             pool = await get_db_pool()
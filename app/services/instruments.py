@@ -1,10 +1,30 @@
 """Instrument management service."""
 from typing import List, Dict, Optional
+import asyncpg
+from asyncpg import Record
+from cachetools import TTLCache
 from loguru import logger
 
 from app.database.connection import get_db_pool
 from app.database.models import Instrument, InstrumentQueries
 from app.brokers import get_broker
+from app.services.auto_backfill import invalidate_stream_tokens
+
+# Search ordering by segment (lower ranks first); anything else ranks 5
+SEGMENT_RANKS = {"INDICES": 1, "NSE": 2, "NFO-FUT": 3, "BSE": 4}
+
+# Instrument metadata only changes when it is synced from the broker, which
+# clears these; the TTL covers edits made outside this process
+_instrument_cache: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+_listing_cache: TTLCache = TTLCache(maxsize=64, ttl=3600)
+_search_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+
+
+def _clear_instrument_caches():
+    """Drop cached instrument lookups after the table changes."""
+    _instrument_cache.clear()
+    _listing_cache.clear()
+    _search_cache.clear()
 
 
 class InstrumentService:
@@ -22,17 +42,36 @@ class InstrumentService:
             broker = get_broker()
             instruments = await broker.get_instruments()
             
-            pool = await get_db_pool()
-            count = 0
-            
+            # Validate and derive search columns in Python, write in bulk
+            rows = []
             for inst_data in instruments:
                 try:
                     instrument = Instrument(**inst_data)
-                    await InstrumentQueries.insert_instrument(pool, instrument)
-                    count += 1
+                    instrument.display_text = (
+                        f"{instrument.symbol} - {instrument.segment} ({instrument.exchange})"
+                    )
+                    instrument.segment_rank = SEGMENT_RANKS.get(instrument.segment, 5)
+                    rows.append(instrument)
                 except Exception as e:
-                    logger.error(f"Failed to insert instrument {inst_data.get('symbol')}: {e}")
+                    logger.error(f"Failed to parse instrument {inst_data.get('symbol')}: {e}")
+            
+            pool = await get_db_pool()
+            try:
+                count = await InstrumentQueries.bulk_upsert_instruments(pool, rows)
+            except asyncpg.DataError as e:
+                # A value the table rejects fails the whole batch; retry row
+                # by row so only the offending instruments are skipped
+                logger.warning(f"Bulk instrument upsert failed ({e}), retrying per row")
+                count = 0
+                for instrument in rows:
+                    try:
+                        await InstrumentQueries.insert_instrument(pool, instrument)
+                        count += 1
+                    except Exception as e:
+                        logger.error(f"Failed to insert instrument {instrument.symbol}: {e}")
             
+            _clear_instrument_caches()
+            await invalidate_stream_tokens()
             logger.info(f"Synced {count} instruments from broker")
             return count
             
@@ -43,29 +82,52 @@ class InstrumentService:
     @staticmethod
     async def get_instrument_by_token(token: int) -> Optional[Dict]:
         """Get instrument by token."""
+        instrument = _instrument_cache.get(token)
+        if instrument is not None:
+            return dict(instrument)
         try:
             pool = await get_db_pool()
-            return await InstrumentQueries.get_instrument_by_token(pool, token)
+            instrument = await InstrumentQueries.get_instrument_by_token(pool, token)
+            if instrument is not None:
+                _instrument_cache[token] = instrument
+                instrument = dict(instrument)
+            return instrument
         except Exception as e:
             logger.error(f"Failed to get instrument: {e}")
             return None
     
     @staticmethod
-    async def get_all_instruments(limit: int = 1000, offset: int = 0) -> List[Dict]:
+    async def get_all_instruments(limit: int = 1000, offset: int = 0) -> List[Record]:
         """Get all instruments with pagination."""
+        key = (limit, offset)
+        instruments = _listing_cache.get(key)
+        if instruments is not None:
+            return instruments
         try:
             pool = await get_db_pool()
-            return await InstrumentQueries.get_all_instruments(pool, limit, offset)
+            instruments = await InstrumentQueries.get_all_instruments(
+                pool, limit, offset
+            )
+            _listing_cache[key] = instruments
+            return instruments
         except Exception as e:
             logger.error(f"Failed to get instruments: {e}")
             return []
     
     @staticmethod
-    async def search_instruments(query: str, limit: int = 50) -> List[Dict]:
+    async def search_instruments(query: str, limit: int = 50) -> List[Record]:
         """Search instruments by symbol or exchange."""
+        key = (query, limit)
+        instruments = _search_cache.get(key)
+        if instruments is not None:
+            return instruments
         try:
             pool = await get_db_pool()
-            return await InstrumentQueries.search_instruments(pool, query, limit)
+            instruments = await InstrumentQueries.search_instruments(
+                pool, query, limit
+            )
+            _search_cache[key] = instruments
+            return instruments
         except Exception as e:
             logger.error(f"Failed to search instruments: {e}")
             return []
@@ -1,13 +1,46 @@
 """Real-time market data streaming service."""
 
 import asyncio
-from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Set
 from loguru import logger
-
-from app.brokers import get_broker
+from websockets.exceptions import ConnectionClosed
+
+from app.brokers import create_broker
+from app.services.auto_backfill import (
+    STREAM_TOKENS_KEY,
+    STREAM_TOKENS_TTL,
+    backfill_seeded,
+)
 from app.services.data_ingestion import data_ingestion_service
 from app.database.connection import get_db_pool
+from app.utils.redis_client import redis_client
+
+
+# Most recently backfilled instruments with candles, run on every refresh
+_STREAM_TOKENS_SQL = """
+    SELECT DISTINCT bs.instrument_token, bs.last_backfilled_date
+    FROM backfill_status bs
+    JOIN instruments i ON i.token = bs.instrument_token
+    WHERE bs.candle_count > 0
+        AND i.segment IN ('INDICES', 'NSE', 'NFO-FUT')
+    ORDER BY bs.last_backfilled_date DESC
+    LIMIT 500  -- Kite WebSocket limit
+"""
+
+# Close code for a connection dropped without a close frame
+ABNORMAL_CLOSURE = 1006
+
+
+def _is_connection_closed(error: Exception) -> bool:
+    """
+    Check whether an error means the broker connection went away.
+
+    Covers socket-level failures and closed WebSockets, including SDK
+    errors that only carry the close code.
+    """
+    if isinstance(error, (ConnectionClosed, OSError)):
+        return True
+    return getattr(error, "code", None) == ABNORMAL_CLOSURE
 
 
 class RealtimeStreamingService:
@@ -17,25 +50,37 @@ class RealtimeStreamingService:
         self.is_running = False
         self.streaming_task = None
         self.broker = None
+        # Tokens the broker socket was asked to stream
+        self._streamed_tokens: Set[int] = set()
+        # Set by stop_streaming to wake the refresh wait in the auto loop
+        self._stop_event = asyncio.Event()
 
     async def get_instruments_to_stream(self) -> List[int]:
         """Get instruments that should be streamed (from backfill_status)."""
+        try:
+            cached = await redis_client.get_json(STREAM_TOKENS_KEY)
+        except Exception as e:
+            logger.warning(f"Redis stream token read failed: {e}")
+            cached = None
+        if cached:
+            logger.info(f"Found {len(cached)} instruments to stream (cached)")
+            return cached
+
         pool = await get_db_pool()
         async with pool.acquire() as conn:
-            rows = await conn.fetch(
-                """
-                SELECT DISTINCT bs.instrument_token, bs.last_backfilled_date
-                FROM backfill_status bs
-                JOIN instruments i ON i.token = bs.instrument_token
-                WHERE bs.candle_count > 0
-                    AND i.segment IN ('INDICES', 'NSE', 'NFO-FUT')
-                ORDER BY bs.last_backfilled_date DESC
-                LIMIT 500  -- Kite WebSocket limit
-                """
-            )
+            stmt = await conn.prepared(_STREAM_TOKENS_SQL)
+            rows = await stmt.fetch()
             tokens = [row["instrument_token"] for row in rows]
             logger.info(f"Found {len(tokens)} instruments to stream")
-            return tokens
+
+        if tokens:
+            try:
+                await redis_client.set_json(
+                    STREAM_TOKENS_KEY, tokens, ex=STREAM_TOKENS_TTL
+                )
+            except Exception as e:
+                logger.warning(f"Redis stream token write failed: {e}")
+        return tokens
 
     async def tick_handler(self, tick_data: Dict):
         """Handle incoming tick data."""
@@ -43,7 +88,8 @@ class RealtimeStreamingService:
             # Store in database via ingestion service
             await data_ingestion_service.handle_tick(tick_data)
         except Exception as e:
-            logger.error(f"Error handling tick: {e}")
+            # Per tick: formatted lazily, only if the record is emitted
+            logger.error("Error handling tick: {}", e)
 
     async def start_streaming(self):
         """Start the real-time streaming service."""
@@ -61,17 +107,20 @@ class RealtimeStreamingService:
 
         # Connect to broker WebSocket
         try:
-            self.broker = get_broker()
+            # Own socket, independent of the /ws tick relay's
+            if self.broker is None:
+                self.broker = create_broker()
             await self.broker.connect_websocket(instruments, self.tick_handler)
+            self._streamed_tokens = set(instruments)
+            self._stop_event.clear()
             self.is_running = True
-            logger.info(f"✅ Streaming {len(instruments)} instruments")
+            logger.info("✅ Streaming {} instruments", len(instruments))
         except Exception as e:
-            error_msg = str(e).lower()
             # Don't treat market closed as an error
-            if "1006" in error_msg or "connection" in error_msg:
-                logger.info(f"WebSocket connection closed (markets may be closed)")
+            if _is_connection_closed(e):
+                logger.info("WebSocket connection closed (markets may be closed)")
             else:
-                logger.error(f"Failed to start streaming: {e}")
+                logger.error("Failed to start streaming: {}", e)
             self.is_running = False
             raise
 
@@ -81,10 +130,12 @@ class RealtimeStreamingService:
             return
 
         logger.info("Stopping real-time streaming...")
+        self._stop_event.set()
         try:
             if self.broker:
                 await self.broker.disconnect_websocket()
             self.is_running = False
+            self._streamed_tokens = set()
             logger.info("✓ Streaming stopped")
         except Exception as e:
             logger.error(f"Error stopping streaming: {e}")
@@ -99,6 +150,9 @@ class RealtimeStreamingService:
         """
         logger.info("🔄 Auto-streaming service started")
 
+        # Instruments to stream are read from backfill_status
+        await backfill_seeded.wait()
+
         retry_delay = 60  # Start with 1 minute
         max_retry_delay = 600  # Max 10 minutes
 
@@ -110,49 +164,54 @@ class RealtimeStreamingService:
                 # Reset retry delay on successful connection
                 retry_delay = 60
 
-                # Keep alive and periodically refresh instrument list
+                # Nothing to stream yet; check again after the backoff
+                if not self.is_running:
+                    await asyncio.sleep(retry_delay)
+                    continue
+
+                # Sleep until the hourly instrument refresh or a stop
                 refresh_interval = 3600  # 1 hour
-                elapsed = 0
 
                 while self.is_running:
-                    await asyncio.sleep(60)  # Check every minute
-                    elapsed += 60
-
-                    # Refresh instrument list every hour
-                    if elapsed >= refresh_interval:
-                        logger.info("Refreshing streaming instrument list...")
-                        instruments = await self.get_instruments_to_stream()
-                        # Check if instrument count changed significantly (>10%)
-                        current_count = len(
-                            getattr(self.broker, "_subscribed_instruments", []) or []
+                    try:
+                        await asyncio.wait_for(
+                            self._stop_event.wait(), timeout=refresh_interval
                         )
-                        if (
-                            instruments
-                            and abs(len(instruments) - current_count)
-                            > current_count * 0.1
-                        ):
+                        break  # Stopped; reconnects in outer loop
+                    except asyncio.TimeoutError:
+                        pass
+
+                    logger.info("Refreshing streaming instrument list...")
+                    instruments = await self.get_instruments_to_stream()
+                    if instruments:
+                        wanted = set(instruments)
+                        added = wanted - self._streamed_tokens
+                        removed = self._streamed_tokens - wanted
+                        changed = len(added) + len(removed)
+                        # Large changes restart the socket; small ones
+                        # are applied to the running subscription
+                        if changed > len(self._streamed_tokens) * 0.1:
                             logger.info(
-                                f"Instrument count changed ({current_count} → {len(instruments)}), restarting stream..."
+                                f"Instrument list changed ({changed} tokens), "
+                                f"restarting stream..."
                             )
                             await self.stop_streaming()
                             break  # Will restart in outer loop
-                        elapsed = 0
+                        if removed:
+                            await self.broker.unsubscribe(list(removed))
+                        if added:
+                            await self.broker.subscribe(list(added))
+                        self._streamed_tokens = wanted
 
             except Exception as e:
-                error_msg = str(e).lower()
-
                 # Check if it's a connection closed error (markets closed)
-                if (
-                    "1006" in error_msg
-                    or "connection" in error_msg
-                    or "closed" in error_msg
-                ):
+                if _is_connection_closed(e):
                     logger.info(
                         f"WebSocket closed (likely markets closed). "
                         f"Will retry in {retry_delay} seconds..."
                     )
                 else:
-                    logger.error(f"Streaming error: {e}")
+                    logger.error("Streaming error: {}", e)
 
                 await self.stop_streaming()
 
@@ -0,0 +1,94 @@
+"""Subscribed instrument service with a Redis-backed read cache."""
+from typing import List, Sequence
+from cachetools import TTLCache
+from loguru import logger
+
+from app.database.connection import get_db_pool
+from app.database.models import SubscriptionQueries
+from app.utils.redis_client import redis_client
+
+# Redis set mirroring the active rows of subscribed_instruments
+SUBSCRIBED_KEY = "subscriptions:active"
+# Upper bound on staleness if Postgres is changed outside this service
+SUBSCRIBED_KEY_TTL = 300
+
+# In-process copy of the set; it rarely changes, so reads skip Redis too
+_local_cache: TTLCache = TTLCache(maxsize=1, ttl=5)
+
+
+class SubscriptionService:
+    """
+    Service for instrument subscriptions.
+    
+    Postgres stays the source of truth and is written first; Redis and the
+    in-process cache only serve reads and are rebuilt from Postgres on miss.
+    """
+    
+    @staticmethod
+    async def get_subscribed_instruments() -> List[int]:
+        """Get all subscribed instrument tokens."""
+        tokens = _local_cache.get(SUBSCRIBED_KEY)
+        if tokens is not None:
+            return list(tokens)
+        
+        try:
+            members = await redis_client.smembers(SUBSCRIBED_KEY)
+        except Exception as e:
+            logger.warning(f"Redis subscription read failed: {e}")
+            members = None
+        
+        if members:
+            tokens = [int(member) for member in members]
+        else:
+            tokens = await SubscriptionService.warm_cache()
+        
+        _local_cache[SUBSCRIBED_KEY] = tokens
+        return list(tokens)
+    
+    @staticmethod
+    async def warm_cache() -> List[int]:
+        """Rebuild the Redis set from Postgres and return its tokens."""
+        pool = await get_db_pool()
+        tokens = await SubscriptionQueries.get_subscribed_instruments(pool)
+        try:
+            await redis_client.replace_set(
+                SUBSCRIBED_KEY, [str(t) for t in tokens], ex=SUBSCRIBED_KEY_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Redis subscription warm failed: {e}")
+        _local_cache[SUBSCRIBED_KEY] = tokens
+        return tokens
+    
+    @staticmethod
+    async def subscribe(tokens: List[int]):
+        """Subscribe to instruments."""
+        pool = await get_db_pool()
+        await SubscriptionQueries.subscribe_many(pool, tokens)
+        await SubscriptionService._update_cache(added=tokens)
+    
+    @staticmethod
+    async def unsubscribe(tokens: List[int]):
+        """Unsubscribe from instruments."""
+        pool = await get_db_pool()
+        await SubscriptionQueries.unsubscribe_many(pool, tokens)
+        await SubscriptionService._update_cache(removed=tokens)
+    
+    @staticmethod
+    async def _update_cache(added: Sequence[int] = (), removed: Sequence[int] = ()):
+        """Apply a committed change to the Redis set and drop the local copy."""
+        _local_cache.pop(SUBSCRIBED_KEY, None)
+        try:
+            # A missing set is rebuilt in full on the next read; adding to
+            # it here would leave a partial set
+            if not await redis_client.exists(SUBSCRIBED_KEY):
+                return
+            if added:
+                await redis_client.sadd(SUBSCRIBED_KEY, *map(str, added))
+            if removed:
+                await redis_client.srem(SUBSCRIBED_KEY, *map(str, removed))
+        except Exception as e:
+            logger.warning(f"Redis subscription update failed: {e}")
+            try:
+                await redis_client.delete(SUBSCRIBED_KEY)
+            except Exception:
+                pass
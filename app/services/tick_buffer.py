@@ -0,0 +1,136 @@
+"""Columnar in-memory buffer for ticks awaiting a database flush."""
+from datetime import datetime, timezone
+from itertools import repeat
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# One contiguous record per tick instead of a tuple of boxed Python objects.
+# Nullable numeric fields are stored as float64 with NaN meaning NULL.
+TICK_DTYPE = np.dtype(
+    [
+        ("time", "datetime64[us]"),
+        ("instrument_token", "i8"),
+        ("ltp", "f8"),
+        ("volume", "f8"),
+        ("open_interest", "f8"),
+        ("bid_price", "f8"),
+        ("ask_price", "f8"),
+        ("bid_qty", "f8"),
+        ("ask_qty", "f8"),
+    ]
+)
+
+# Nullable fields in COPY column order after time/instrument_token
+_NULLABLE_FIELDS = (
+    "ltp",
+    "volume",
+    "open_interest",
+    "bid_price",
+    "ask_price",
+    "bid_qty",
+    "ask_qty",
+)
+# Of those, the ones converted back to Python ints on drain
+_INT_FIELDS = ("volume", "open_interest", "bid_qty", "ask_qty")
+
+
+# Aware epoch that the tick times are offsets from
+_UTC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NP_EPOCH = np.datetime64(0, "us")
+
+
+def _nullable(value) -> float:
+    """Map None to NaN for float storage."""
+    return np.nan if value is None else value
+
+
+def ticks_to_rows(ticks: np.ndarray) -> List[tuple]:
+    """
+    Convert a TICK_DTYPE array into row tuples in TickDataQueries.COLUMNS order.
+
+    NaN fields become None, integer fields are restored to ints and the
+    naive UTC times get their timezone back for the timestamptz column.
+    """
+    columns = [
+        # Epoch + timedelta builds aware datetimes without a replace() each
+        list(map(_UTC_EPOCH.__add__, (ticks["time"] - _NP_EPOCH).astype(object))),
+        ticks["instrument_token"].tolist(),
+    ]
+    for name in _NULLABLE_FIELDS:
+        values = ticks[name]
+        nulls = np.isnan(values)
+        if nulls.all():
+            # Fields a whole batch lacks (quotes on synthetic candle ticks)
+            columns.append(repeat(None, len(ticks)))
+            continue
+        if name in _INT_FIELDS:
+            values = np.where(nulls, 0, values).astype(np.int64)
+        if not nulls.any():
+            # tolist() boxes straight to Python scalars, no object array
+            columns.append(values.tolist())
+            continue
+        column = values.astype(object)
+        column[nulls] = None
+        columns.append(column)
+
+    return list(zip(*columns))
+
+
+class TickRingBuffer:
+    """
+    Preallocated structured array that ticks are written into by index.
+
+    Ticks are appended in place and drained as tuples in
+    TickDataQueries.COLUMNS order for COPY.
+    """
+
+    def __init__(self, capacity: int, max_capacity: Optional[int] = None):
+        self._buf = np.zeros(capacity, dtype=TICK_DTYPE)
+        self._size = 0
+        # Growth limit; beyond it appends are rejected instead of using memory
+        self._max_capacity = max_capacity or capacity
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, tick_data: Dict) -> bool:
+        """
+        Write one tick into the next free slot, growing up to max_capacity.
+
+        Returns:
+            False if the buffer is at max_capacity and the tick was dropped
+        """
+        if self._size == len(self._buf):
+            if self._size >= self._max_capacity:
+                return False
+            self._buf = np.resize(
+                self._buf, min(len(self._buf) * 2, self._max_capacity)
+            )
+
+        # Stored as naive UTC; a naive tick time is taken as local time
+        tick_time = tick_data.get("time") or datetime.now(timezone.utc)
+        tick_time = tick_time.astimezone(timezone.utc).replace(tzinfo=None)
+
+        self._buf[self._size] = (
+            tick_time,
+            tick_data.get("instrument_token"),
+            _nullable(tick_data.get("ltp")),
+            _nullable(tick_data.get("volume")),
+            _nullable(tick_data.get("open_interest")),
+            _nullable(tick_data.get("bid_price")),
+            _nullable(tick_data.get("ask_price")),
+            _nullable(tick_data.get("bid_qty")),
+            _nullable(tick_data.get("ask_qty")),
+        )
+        self._size += 1
+        return True
+
+    def drain(self) -> List[tuple]:
+        """Return buffered ticks as row tuples and reset the buffer."""
+        if not self._size:
+            return []
+
+        rows = ticks_to_rows(self._buf[: self._size])
+        self._size = 0
+        return rows
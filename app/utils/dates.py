@@ -0,0 +1,61 @@
+"""Date helpers for API query parameters and market hours."""
+from datetime import date, datetime, time, timezone
+from typing import Annotated, Any, Optional
+from zoneinfo import ZoneInfo
+
+from pydantic import BeforeValidator
+
+
+def _expand_date(value: Any) -> Any:
+    """Expand a date-only value (YYYY-MM-DD) to midnight UTC."""
+    if isinstance(value, str) and len(value) == 10:
+        value = date.fromisoformat(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, time.min, tzinfo=timezone.utc)
+    return value
+
+
+# Datetime API parameter that also accepts a bare date, which Pydantic 2
+# rejects for datetime fields
+DateOrDateTime = Annotated[datetime, BeforeValidator(_expand_date)]
+
+
+def as_utc(value: datetime) -> datetime:
+    """
+    Make a datetime timezone-aware, treating naive values as UTC.
+
+    DateOrDateTime parameters parse ISO-8601 values (YYYY-MM-DD,
+    YYYY-MM-DD HH:MM:SS, or with a UTC offset) into datetimes; naive
+    results are assumed to be UTC.
+
+    Args:
+        value: Parsed datetime
+
+    Returns:
+        Timezone-aware datetime
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# NSE/BSE cash and F&O session, in exchange local time
+MARKET_TZ = ZoneInfo("Asia/Kolkata")
+MARKET_OPEN = time(9, 15)
+MARKET_CLOSE = time(15, 30)
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """
+    Check whether the exchange session is live (weekdays, 09:15-15:30 IST).
+
+    Exchange holidays are not known here, so they count as open.
+
+    Args:
+        now: Moment to check (defaults to the current time)
+
+    Returns:
+        True during trading hours
+    """
+    local = (now or datetime.now(timezone.utc)).astimezone(MARKET_TZ)
+    return local.weekday() < 5 and MARKET_OPEN <= local.time() <= MARKET_CLOSE
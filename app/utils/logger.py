@@ -5,7 +5,13 @@ from app.config import settings
 
 
 def setup_logger():
-    """Configure application logger."""
+    """
+    Configure application logger.
+    
+    Handlers are enqueued, so formatting and I/O happen on loguru's writer
+    thread rather than in the event loop (e.g. during a burst of tick
+    errors). diagnose is off: it captures frame locals on every exception.
+    """
     # Remove default handler
     logger.remove()
     
@@ -14,7 +20,10 @@ def setup_logger():
         sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
         level=settings.log_level,
-        colorize=True
+        colorize=True,
+        enqueue=True,
+        backtrace=False,
+        diagnose=False
     )
     
     # Add file handler for errors
@@ -24,7 +33,10 @@ def setup_logger():
         level="ERROR",
         rotation="10 MB",
         retention="7 days",
-        compression="zip"
+        compression="zip",
+        enqueue=True,
+        backtrace=False,
+        diagnose=False
     )
     
     # Add file handler for all logs
@@ -34,7 +46,10 @@ def setup_logger():
         level="INFO",
         rotation="50 MB",
         retention="7 days",
-        compression="zip"
+        compression="zip",
+        enqueue=True,
+        backtrace=False,
+        diagnose=False
     )
     
     logger.info("Logger initialized")
@@ -0,0 +1,27 @@
+"""Async rate limiting for broker API calls."""
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Space out calls to at most ``rate`` per second across all tasks.
+
+    Each acquire reserves the next free start slot, so concurrent callers
+    queue behind each other instead of bursting past the broker's limit.
+    """
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until this caller's slot comes up."""
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -1,12 +1,17 @@
 """Redis client management."""
+import orjson
 import redis.asyncio as redis
-from typing import Optional
+from typing import Any, List, Optional
 from loguru import logger
 from app.config import settings
 
 
 class RedisClient:
-    """Redis client wrapper."""
+    """
+    Redis client wrapper.
+    
+    connect() is called once at startup; the other methods assume it has.
+    """
     
     def __init__(self):
         self._client: Optional[redis.Redis] = None
@@ -17,7 +22,10 @@ class RedisClient:
             self._client = await redis.from_url(
                 settings.redis_url,
                 encoding="utf-8",
-                decode_responses=True
+                decode_responses=True,
+                max_connections=50,
+                socket_keepalive=True,
+                health_check_interval=30,
             )
             await self._client.ping()
             logger.info("Redis connected successfully")
@@ -33,45 +41,87 @@ class RedisClient:
     
     async def get(self, key: str) -> Optional[str]:
         """Get value by key."""
-        if not self._client:
-            await self.connect()
         return await self._client.get(key)
     
     async def set(self, key: str, value: str, ex: Optional[int] = None):
         """Set key-value pair with optional expiration."""
-        if not self._client:
-            await self.connect()
         await self._client.set(key, value, ex=ex)
     
+    async def get_json(self, key: str) -> Any:
+        """Get a JSON value by key (None if missing)."""
+        value = await self._client.get(key)
+        return orjson.loads(value) if value is not None else None
+    
+    async def set_json(self, key: str, value: Any, ex: Optional[int] = None):
+        """Set a value serialized with orjson, with optional expiration."""
+        await self._client.set(key, orjson.dumps(value), ex=ex)
+    
+    async def set_nx(self, key: str, value: str, ex: Optional[int] = None) -> bool:
+        """Set a key only if it doesn't exist; True if it was set."""
+        return bool(await self._client.set(key, value, ex=ex, nx=True))
+    
     async def delete(self, key: str):
         """Delete key."""
-        if not self._client:
-            await self.connect()
         await self._client.delete(key)
     
     async def exists(self, key: str) -> bool:
         """Check if key exists."""
-        if not self._client:
-            await self.connect()
         return await self._client.exists(key) > 0
     
     async def hset(self, name: str, key: str, value: str):
         """Set hash field."""
-        if not self._client:
-            await self.connect()
         await self._client.hset(name, key, value)
     
     async def hget(self, name: str, key: str) -> Optional[str]:
         """Get hash field."""
-        if not self._client:
-            await self.connect()
         return await self._client.hget(name, key)
     
     async def hgetall(self, name: str) -> dict:
         """Get all hash fields."""
-        if not self._client:
-            await self.connect()
         return await self._client.hgetall(name)
+    
+    async def hset_many(self, name: str, mapping: dict):
+        """Set several hash fields in one command."""
+        if not mapping:
+            return
+        await self._client.hset(name, mapping=mapping)
+    
+    async def mset(self, pairs: dict, ex: Optional[int] = None):
+        """Set several key-value pairs in one round trip (pipelined)."""
+        if not pairs:
+            return
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key, value in pairs.items():
+                pipe.set(key, value, ex=ex)
+            await pipe.execute()
+    
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """Get several keys in one command (None for missing keys)."""
+        if not keys:
+            return []
+        return await self._client.mget(keys)
+    
+    async def sadd(self, name: str, *values: str) -> int:
+        """Add members to a set."""
+        return await self._client.sadd(name, *values)
+    
+    async def srem(self, name: str, *values: str) -> int:
+        """Remove members from a set."""
+        return await self._client.srem(name, *values)
+    
+    async def smembers(self, name: str) -> set:
+        """Get all members of a set."""
+        return await self._client.smembers(name)
+    
+    async def replace_set(self, name: str, values: list, ex: Optional[int] = None):
+        """Atomically replace a set's members (an empty list deletes it)."""
+        async with self._client.pipeline(transaction=True) as pipe:
+            pipe.delete(name)
+            if values:
+                pipe.sadd(name, *values)
+                if ex:
+                    pipe.expire(name, ex)
+            await pipe.execute()
 
 
 # Global Redis client instance
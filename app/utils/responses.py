@@ -0,0 +1,29 @@
+"""Fast JSON responses for large payloads."""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from asyncpg import Record
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any) -> Any:
+    """Serialize types orjson doesn't handle natively."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Record):
+        return dict(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    Return it directly from an endpoint to skip FastAPI's jsonable_encoder
+    pass; asyncpg NUMERIC values (Decimal) are emitted as floats and
+    asyncpg Records as objects, so query results need no dict copy.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
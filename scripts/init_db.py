@@ -1,5 +1,4 @@
 """Database initialization script."""
-import asyncio
 import sys
 from pathlib import Path
 
@@ -8,6 +7,36 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.database.connection import init_db, close_db, get_db_pool
 from loguru import logger
+import uvloop
+
+# Tables, hypertable, continuous aggregates and policies the schema creates
+_SCHEMA_CHECKS_SQL = """
+    SELECT
+        EXISTS (
+            SELECT FROM information_schema.tables
+            WHERE table_name = 'instruments'
+        ) AS has_instruments,
+        EXISTS (
+            SELECT FROM information_schema.tables
+            WHERE table_name = 'tick_data'
+        ) AS has_tick_data,
+        EXISTS (
+            SELECT FROM timescaledb_information.hypertables
+            WHERE hypertable_name = 'tick_data'
+        ) AS is_hypertable,
+        ARRAY(
+            SELECT view_name
+            FROM timescaledb_information.continuous_aggregates
+        ) AS continuous_aggregates,
+        EXISTS (
+            SELECT FROM timescaledb_information.compression_settings
+            WHERE hypertable_name = 'tick_data'
+        ) AS has_compression,
+        EXISTS (
+            SELECT FROM timescaledb_information.jobs
+            WHERE proc_name = 'policy_retention'
+        ) AS has_retention
+"""
 
 
 async def initialize_database():
@@ -18,85 +47,42 @@ async def initialize_database():
         
         pool = await get_db_pool()
         
-        # Verify tables exist
+        # Verify tables exist, every check in one round trip
         async with pool.acquire() as conn:
-            # Check instruments table
-            result = await conn.fetchval("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'instruments'
-                )
-            """)
-            
-            if result:
-                logger.info("✓ Instruments table exists")
-            else:
-                logger.error("✗ Instruments table not found")
-            
-            # Check tick_data hypertable
-            result = await conn.fetchval("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'tick_data'
-                )
-            """)
-            
-            if result:
-                logger.info("✓ Tick data table exists")
-                
-                # Verify it's a hypertable
-                is_hypertable = await conn.fetchval("""
-                    SELECT EXISTS (
-                        SELECT FROM timescaledb_information.hypertables 
-                        WHERE hypertable_name = 'tick_data'
-                    )
-                """)
-                
-                if is_hypertable:
-                    logger.info("✓ Tick data is a hypertable")
-                else:
-                    logger.warning("✗ Tick data is not a hypertable")
-            else:
-                logger.error("✗ Tick data table not found")
-            
-            # Check continuous aggregates
-            result = await conn.fetch("""
-                SELECT view_name 
-                FROM timescaledb_information.continuous_aggregates
-            """)
-            
-            if result:
-                logger.info(f"✓ Found {len(result)} continuous aggregates:")
-                for row in result:
-                    logger.info(f"  - {row['view_name']}")
-            else:
-                logger.warning("✗ No continuous aggregates found")
-            
-            # Check compression policy
-            result = await conn.fetchval("""
-                SELECT EXISTS (
-                    SELECT FROM timescaledb_information.compression_settings
-                    WHERE hypertable_name = 'tick_data'
-                )
-            """)
-            
-            if result:
-                logger.info("✓ Compression policy configured")
-            else:
-                logger.warning("✗ Compression policy not found")
-            
-            # Check retention policy
-            result = await conn.fetchval("""
-                SELECT EXISTS (
-                    SELECT FROM timescaledb_information.jobs
-                    WHERE proc_name = 'policy_retention'
-                )
-            """)
+            checks = await conn.fetchrow(_SCHEMA_CHECKS_SQL)
+        
+        if checks["has_instruments"]:
+            logger.info("✓ Instruments table exists")
+        else:
+            logger.error("✗ Instruments table not found")
+        
+        if checks["has_tick_data"]:
+            logger.info("✓ Tick data table exists")
             
-            if result:
-                logger.info("✓ Retention policy configured")
+            if checks["is_hypertable"]:
+                logger.info("✓ Tick data is a hypertable")
             else:
-                logger.warning("✗ Retention policy not found")
+                logger.warning("✗ Tick data is not a hypertable")
+        else:
+            logger.error("✗ Tick data table not found")
+        
+        aggregates = checks["continuous_aggregates"]
+        if aggregates:
+            logger.info(f"✓ Found {len(aggregates)} continuous aggregates:")
+            for view_name in aggregates:
+                logger.info(f"  - {view_name}")
+        else:
+            logger.warning("✗ No continuous aggregates found")
+        
+        if checks["has_compression"]:
+            logger.info("✓ Compression policy configured")
+        else:
+            logger.warning("✗ Compression policy not found")
+        
+        if checks["has_retention"]:
+            logger.info("✓ Retention policy configured")
+        else:
+            logger.warning("✗ Retention policy not found")
         
         logger.info("Database initialization complete!")
         
@@ -108,5 +94,5 @@ async def initialize_database():
 
 
 if __name__ == "__main__":
-    asyncio.run(initialize_database())
+    uvloop.run(initialize_database())
 
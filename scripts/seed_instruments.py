@@ -1,5 +1,4 @@
 """Seed instruments from broker."""
-import asyncio
 import sys
 from pathlib import Path
 
@@ -9,6 +8,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from app.database.connection import init_db, close_db
 from app.services.instruments import InstrumentService
 from loguru import logger
+import uvloop
 
 
 async def seed_instruments():
@@ -30,5 +30,5 @@ async def seed_instruments():
 
 
 if __name__ == "__main__":
-    asyncio.run(seed_instruments())
+    uvloop.run(seed_instruments())
 
@@ -1,5 +1,4 @@
 """Subscribe to specific instruments for real-time streaming."""
-import asyncio
 import sys
 from pathlib import Path
 
@@ -9,6 +8,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from app.database.connection import init_db, close_db, get_db_pool
 from app.database.models import SubscriptionQueries
 from loguru import logger
+import uvloop
 
 
 async def subscribe_instruments(tokens: list[int]):
@@ -24,9 +24,9 @@ async def subscribe_instruments(tokens: list[int]):
         
         pool = await get_db_pool()
         
-        for token in tokens:
-            await SubscriptionQueries.subscribe_instrument(pool, token)
-            logger.info(f"Subscribed to instrument: {token}")
+        # All tokens in a single UNNEST upsert
+        await SubscriptionQueries.subscribe_many(pool, tokens)
+        logger.info(f"Subscribed to instruments: {', '.join(map(str, tokens))}")
         
         logger.info(f"Successfully subscribed to {len(tokens)} instruments!")
         
@@ -57,5 +57,5 @@ if __name__ == "__main__":
         tokens = example_tokens
         logger.info("Using example tokens. Pass tokens as arguments: python subscribe_instruments.py 256265 260105")
     
-    asyncio.run(subscribe_instruments(tokens))
+    uvloop.run(subscribe_instruments(tokens))
 
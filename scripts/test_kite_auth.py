@@ -1,8 +1,8 @@
 #!/usr/bin/env python
 """Test Kite authentication system."""
-import asyncio
 import sys
 import os
+import traceback
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -10,6 +10,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 from app.config import settings
 from app.brokers.auth.kite_auth import KiteAuth
 from loguru import logger
+import uvloop
 
 
 async def test_auth():
@@ -67,8 +68,6 @@ async def test_auth():
 
     except Exception as e:
         logger.error(f"\n❌ Authentication Test FAILED: {e}")
-        import traceback
-
         traceback.print_exc()
         return False
 
@@ -89,4 +88,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    exit(asyncio.run(main()))
+    exit(uvloop.run(main()))